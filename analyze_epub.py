@@ -1,69 +1,83 @@
 #!/usr/bin/env python3
 
+import argparse
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from epub_toc import EPUBTOCParser
 
+# (report label, method name, parser attribute) for each probed method
+PROBES = [
+    ("1. epub_meta method:", "epub_meta", "_extract_from_epub_meta"),
+    ("2. NCX method:", "ncx", "_extract_from_ncx"),
+    ("3. OPF method:", "opf", "_extract_from_opf"),
+]
+
 def analyze_epub(epub_path, output_dir):
-    """Analyze EPUB file and test different extraction methods."""
-    print(f"\nAnalyzing {epub_path.name}...")
+    """Analyze EPUB file and test different extraction methods.
+    
+    Returns:
+        The report text for this file, so callers can emit it in one write
+    """
+    lines = [f"\nAnalyzing {epub_path.name}..."]
     
     try:
-        parser = EPUBTOCParser(epub_path)
-        
-        # Try each extraction method
-        print("\nTesting extraction methods:")
-        
-        print("1. epub_meta method:", end=" ")
-        try:
-            meta_toc = parser._extract_from_epub_meta()
-            if meta_toc:
-                print("✓ Success")
-                print(f"  Items found: {len(meta_toc)}")
-            else:
-                print("✗ No TOC found")
-        except Exception as e:
-            print(f"✗ Error: {str(e)}")
+        # One parser per file, closed afterwards; its probed method results
+        # are reused by extract_toc below
+        with EPUBTOCParser(epub_path) as parser:
+            # Try each extraction method
+            lines.append("\nTesting extraction methods:")
             
-        print("2. NCX method:", end=" ")
-        try:
-            ncx_toc = parser._extract_from_ncx()
-            if ncx_toc:
-                print("✓ Success")
-                print(f"  Items found: {len(ncx_toc)}")
-            else:
-                print("✗ No TOC found")
-        except Exception as e:
-            print(f"✗ Error: {str(e)}")
+            # Probe only the methods whose sources the package declares
+            available = parser.available_methods()
+            for label, name, method_attr in PROBES:
+                if name not in available:
+                    lines.append(f"{label} - Skipped (source not present)")
+                    continue
+                try:
+                    method_toc = getattr(parser, method_attr)()
+                    if method_toc:
+                        lines.append(f"{label} ✓ Success")
+                        lines.append(f"  Items found: {len(method_toc)}")
+                    else:
+                        lines.append(f"{label} ✗ No TOC found")
+                except Exception as e:
+                    lines.append(f"{label} ✗ Error: {str(e)}")
             
-        print("3. OPF method:", end=" ")
-        try:
-            opf_toc = parser._extract_from_opf()
-            if opf_toc:
-                print("✓ Success")
-                print(f"  Items found: {len(opf_toc)}")
-            else:
-                print("✗ No TOC found")
-        except Exception as e:
-            print(f"✗ Error: {str(e)}")
-            
-        # Try automatic extraction
-        print("\nTrying automatic extraction:")
-        try:
-            toc = parser.extract_toc()
-            print("✓ Success")
-            print(f"Items found: {len(toc)}")
-            
-            # Save to JSON
-            json_path = output_dir / f"{epub_path.stem}_toc.json"
-            parser.save_toc_to_json(json_path)
-            print(f"TOC saved to: {json_path}")
-            
-        except Exception as e:
-            print(f"✗ Error: {str(e)}")
+            # Try automatic extraction
+            lines.append("\nTrying automatic extraction:")
+            try:
+                toc = parser.extract_toc()
+                lines.append("✓ Success")
+                lines.append(f"Items found: {len(toc)}")
+                
+                # Save to JSON
+                json_path = output_dir / f"{epub_path.stem}_toc.json"
+                parser.save_toc_to_json(json_path)
+                lines.append(f"TOC saved to: {json_path}")
             
+            except Exception as e:
+                lines.append(f"✗ Error: {str(e)}")
+        
     except Exception as e:
-        print(f"Error analyzing file: {str(e)}")
+        lines.append(f"Error analyzing file: {str(e)}")
+    
+    return "\n".join(lines) + "\n"
+
+def _analyze_one(args):
+    """Analyze one EPUB in a worker process and return its report text."""
+    epub_path, output_dir = args
+    return analyze_epub(Path(epub_path), Path(output_dir))
+
+def _iter_epubs(directory):
+    """Yield paths of EPUB files in the directory as they are listed."""
+    # DirEntry answers is_file() from the listing itself
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.epub'):
+                yield entry.path
 
 def process_directory(input_dir, output_dir):
     """Process all EPUB files in the input directory."""
@@ -73,20 +87,92 @@ def process_directory(input_dir, output_dir):
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
     
-    # Find all EPUB files
-    epub_files = list(input_path.glob("*.epub"))
+    # Files are handed to the workers while the directory is still being
+    # listed; reports are printed in listing order
+    tasks = ((epub_file, str(output_path)) for epub_file in _iter_epubs(input_path))
+    count = 0
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for report in executor.map(_analyze_one, tasks, chunksize=8):
+            sys.stdout.write(report)
+            count += 1
     
-    if not epub_files:
+    if count:
+        print(f"\nProcessed {count} EPUB files")
+    else:
         print(f"No EPUB files found in {input_dir}")
-        return
+
+def _wait_until_written(path, interval=0.5, timeout=300):
+    """Wait until the file's size stops changing.
+    
+    Returns:
+        False if the file disappeared or kept growing until the timeout
+    """
+    deadline = time.monotonic() + timeout
+    last_size = -1
+    while time.monotonic() < deadline:
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return False
+        if size == last_size and size > 0:
+            return True
+        last_size = size
+        time.sleep(interval)
+    return False
+
+def watch_directory(input_dir, output_dir):
+    """Analyze EPUB files as they appear in the input directory.
+    
+    Files created in or moved into the directory are analyzed once their
+    size stops changing, so copies in progress are not parsed. Runs until
+    interrupted. Requires the optional ``watchdog`` package.
+    """
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    class EPUBHandler(FileSystemEventHandler):
+        def on_created(self, event):
+            if not event.is_directory:
+                self._analyze(event.src_path)
         
-    print(f"Found {len(epub_files)} EPUB files")
+        def on_moved(self, event):
+            # Files renamed into place after being written elsewhere
+            if not event.is_directory:
+                self._analyze(event.dest_path)
+        
+        def _analyze(self, path):
+            if not path.lower().endswith('.epub'):
+                return
+            # Creation is reported before a copy finishes
+            if not _wait_until_written(path):
+                return
+            sys.stdout.write(analyze_epub(Path(path), output_path))
+            sys.stdout.flush()
     
-    # Process each file
-    for epub_file in epub_files:
-        analyze_epub(epub_file, output_path)
+    observer = Observer()
+    observer.schedule(EPUBHandler(), str(input_dir), recursive=False)
+    observer.start()
+    print(f"Watching {input_dir} for new EPUB files (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Analyze TOC extraction for EPUB files")
+    arg_parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and analyze EPUB files added to the input directory"
+    )
+    args = arg_parser.parse_args()
+    
     input_dir = "tests/data/epub_samples"
     output_dir = "tests/data/epub_toc_json"
     
@@ -95,6 +181,13 @@ def main():
         sys.exit(1)
         
     process_directory(input_dir, output_dir)
+    
+    if args.watch:
+        try:
+            watch_directory(input_dir, output_dir)
+        except ImportError:
+            print("Error: --watch requires the watchdog package (pip install watchdog)")
+            sys.exit(1)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -19,7 +19,10 @@ Notes:
 
 __version__ = "1.0.0"
 
+import copy
+import functools
 import json
+import os
 from typing import Dict, List
 from .parser import EPUBTOCParser, TOCItem
 from .exceptions import (
@@ -32,6 +35,19 @@ from .exceptions import (
     OutputError
 )
 
+@functools.lru_cache(maxsize=128)
+def _cached_extract(epub_path: str, mtime_ns: int, size: int) -> List[Dict]:
+    """Extract the TOC once per file version; mtime/size are the cache key."""
+    # Close the archive right away; cached entries must not hold it open
+    with EPUBTOCParser(epub_path) as parser:
+        return parser.extract_toc()
+
+def _extract(epub_path: str) -> List[Dict]:
+    """Return a private copy of the TOC for the file's current contents."""
+    st = os.stat(epub_path)
+    # The cached list is shared; copy it so callers may modify theirs
+    return copy.deepcopy(_cached_extract(os.fspath(epub_path), st.st_mtime_ns, st.st_size))
+
 def get_toc(epub_path: str) -> str:
     """
     Get table of contents from EPUB file as JSON string.
@@ -42,7 +58,7 @@ def get_toc(epub_path: str) -> str:
     Returns:
         JSON string containing the table of contents
     """
-    toc = EPUBTOCParser(epub_path).extract_toc()
+    toc = _extract(epub_path)
     return json.dumps(toc, indent=2, ensure_ascii=False)
 
 def search_toc(epub_path: str, query: str, case_sensitive: bool = False) -> str:
@@ -57,7 +73,7 @@ def search_toc(epub_path: str, query: str, case_sensitive: bool = False) -> str:
     Returns:
         JSON string with list of matching TOC entries with their paths
     """
-    toc = json.loads(get_toc(epub_path))
+    toc = _extract(epub_path)
     results = []
     
     def search_in_entry(entry: Dict, path: List[str] = None):
@@ -98,7 +114,7 @@ def get_toc_stats(epub_path: str) -> str:
         - max_depth: Maximum nesting level
         - chapters_by_level: Number of entries at each level
     """
-    toc = json.loads(get_toc(epub_path))
+    toc = _extract(epub_path)
     stats = {
         'total_entries': 0,
         'max_depth': 0,
@@ -133,8 +149,8 @@ def compare_tocs(epub1_path: str, epub2_path: str) -> str:
         - unique_to_second: Entries only in second TOC
         - structure_differences: Structural differences
     """
-    toc1 = json.loads(get_toc(epub1_path))
-    toc2 = json.loads(get_toc(epub2_path))
+    toc1 = _extract(epub1_path)
+    toc2 = _extract(epub2_path)
     
     def get_titles(toc):
         titles = set()
@@ -14,18 +14,31 @@ Examples:
     >>> item.add_child(TOCItem('Section 1.1', 'chapter1.html#section1', level=1))
 """
 
+import functools
+import hashlib
+import io
 import json
 import logging
+import os
+import posixpath
+import re
+import sys
 import zipfile
 import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from pathlib import Path
 from typing import List, Dict, Optional, Union, Tuple
+from urllib.parse import unquote
 
-from bs4 import BeautifulSoup
 from epub_meta import get_epub_metadata
 from lxml import etree
-from ebooklib import epub
-from tika import parser as tika_parser
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator, see the "fast" extra
+    orjson = None
 
 from .exceptions import (
     ValidationError,
@@ -37,9 +50,69 @@ from .exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Shared lxml settings for EPUB metadata documents: ID tables and
+# whitespace-only text nodes are never used, so skip building them.
+# Entity expansion and network access stay off, as with defusedxml.
+_XML_PARSER_OPTIONS = {
+    'remove_blank_text': True,
+    'collect_ids': False,
+    'huge_tree': False,
+    'resolve_entities': False,
+    'no_network': True,
+}
+_XML_PARSER = etree.XMLParser(**_XML_PARSER_OPTIONS)
+
+# Clark-notation names used when walking EPUB metadata documents
+_CONTAINER_NS = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+_CONTAINER_ROOTFILE = f'.//{_CONTAINER_NS}rootfile'
+
+_NCX_NS = '{http://www.daisy.org/z3986/2005/ncx/}'
+_NCX_NAVPOINT = _NCX_NS + 'navPoint'
+_NCX_NAMESPACES = {'ncx': 'http://www.daisy.org/z3986/2005/ncx/'}
+
+# Compiled once; plain strings so results don't keep cleared elements alive
+_NCX_NAVLABEL_TEXT = etree.XPath(
+    'ncx:navLabel/ncx:text/text()', namespaces=_NCX_NAMESPACES, smart_strings=False
+)
+_NCX_CONTENT_SRC = etree.XPath(
+    'ncx:content/@src', namespaces=_NCX_NAMESPACES, smart_strings=False
+)
+_NCX_MEDIA_TYPE = 'application/x-dtbncx+xml'
+
+_OPF_NS = '{http://www.idpf.org/2007/opf}'
+_OPF_SPINE = _OPF_NS + 'spine'
+_OPF_MANIFEST = _OPF_NS + 'manifest'
+_OPF_ITEM = _OPF_NS + 'item'
+_OPF_ITEMREF = _OPF_NS + 'itemref'
+_OPF_TAGS = (_OPF_SPINE, _OPF_MANIFEST, _OPF_ITEM, _OPF_ITEMREF)
+
+# "<indent>Title -> href" lines printed by ebook-meta --get-toc
+_CALIBRE_TOC_LINE = re.compile(r'(\s*)(.*?)(?:\s+->\s+(.*?))?\s*$')
+
+def _remember_result(method_name: str):
+    """Store an extractor's result on the parser under ``method_name``.
+    
+    Repeated calls on the same parser, including the ones made by
+    ``extract_toc`` after a caller probed a method directly, return
+    the stored result instead of parsing the EPUB again.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self):
+            if method_name in self._method_results:
+                return self._method_results[method_name]
+            result = func(self)
+            self._method_results[method_name] = result
+            return result
+        return wrapper
+    return decorator
+
 class TOCItem:
     """Represents a Table of Contents item."""
     
+    # Large books create thousands of items; skip the per-instance __dict__
+    __slots__ = ('title', 'href', 'level', 'description', 'children')
+    
     def __init__(self, title: str, href: str, level: int = 0, description: str = None):
         """Initialize TOC item with validation.
         
@@ -57,8 +130,9 @@ class TOCItem:
         if not href or not href.strip():
             raise ValidationError("TOC item must have a non-empty href")
             
-        self.title = title.strip()
-        self.href = href.strip()
+        # Repeated titles ("Notes", "Chapter") and hrefs share one string
+        self.title = sys.intern(title.strip())
+        self.href = sys.intern(href.strip())
         self.level = level
         self.description = description.strip() if description else None
         self.children = []
@@ -69,15 +143,24 @@ class TOCItem:
 
     def to_dict(self) -> Dict:
         """Convert TOC item to dictionary."""
-        result = {
-            'title': self.title,
-            'href': self.href,
-            'level': self.level,
-            'children': [child.to_dict() for child in self.children]
-        }
-        if self.description:
-            result['description'] = self.description
-        return result
+        # Pre-order walk with an explicit stack: each node's dict is
+        # appended to its parent's 'children' list as it is visited
+        root = []
+        stack = [(self, root)]
+        while stack:
+            item, siblings = stack.pop()
+            result = {
+                'title': item.title,
+                'href': item.href,
+                'level': item.level,
+                'children': []
+            }
+            if item.description:
+                result['description'] = item.description
+            siblings.append(result)
+            children = result['children']
+            stack.extend((child, children) for child in reversed(item.children))
+        return root[0]
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'TOCItem':
@@ -140,35 +223,56 @@ class EPUBTOCParser:
         ('calibre', '_extract_from_calibre')
     ]
     
-    def __init__(self, epub_path: Union[str, Path], extraction_methods: List[str] = None):
+    # Methods that run external tools (a JVM, a subprocess); they are only
+    # tried after the others fail, concurrently and under a timeout
+    SLOW_METHODS = frozenset({'tika', 'calibre'})
+    SLOW_METHOD_TIMEOUT = 120
+    
+    def __init__(self, epub_path: Union[str, Path], extraction_methods: List[str] = None,
+                 cache_dir: Union[str, Path] = None):
         """Initialize parser.
         
         Args:
             epub_path: Path to EPUB file
             extraction_methods: List of method names to use, in priority order.
                               If None, all methods will be used in default order.
+            cache_dir: Optional directory for extracted TOCs. A TOC saved there
+                       for the same file path, mtime and size is loaded
+                       instead of parsing the EPUB again.
         
         Raises:
             ValidationError: If file doesn't exist or has wrong extension
         """
         self.epub_path = Path(epub_path)
+        self._epub_path_str = os.fspath(self.epub_path)  # for str-only APIs
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
         self.toc = None
+        self.extraction_method = None  # name of the method that produced self.toc
+        self._zip = None
+        self._opf_path = None
+        self._opf_package = None
+        self._toc_key = None
+        self._method_results = {}
+        self._epub_meta = None
         
         # Set up extraction methods
         if extraction_methods is not None:
             if not extraction_methods:
                 raise ValidationError("No extraction methods specified")
+            # Keep the caller's order; it is the priority order
+            known = dict(self.EXTRACTION_METHODS)
             self.active_methods = [
-                (name, method) for name, method in self.EXTRACTION_METHODS
-                if name in extraction_methods
+                (name, known[name]) for name in dict.fromkeys(extraction_methods)
+                if name in known
             ]
             if not self.active_methods:
                 raise ValidationError(f"No valid extraction methods found in: {extraction_methods}")
         else:
             self.active_methods = self.EXTRACTION_METHODS
+        self._default_methods = extraction_methods is None
             
         self._validate_file()
-        logger.info(f"Initialized parser for {self.epub_path} with methods: {[m[0] for m in self.active_methods]}")
+        logger.info("Initialized parser for %s with methods: %s", self.epub_path, [m[0] for m in self.active_methods])
     
     def _validate_file(self):
         """Validate EPUB file existence and format.
@@ -184,28 +288,190 @@ class EPUBTOCParser:
         if self.epub_path.is_dir():
             raise ValidationError("Path points to a directory")
             
+        # The archive opened here is kept for the extraction methods
         try:
-            with zipfile.ZipFile(self.epub_path, 'r') as epub:
-                # Check for required EPUB files
-                required_files = ['META-INF/container.xml']
-                missing_files = [f for f in required_files if f not in epub.namelist()]
-                if missing_files:
-                    raise StructureError(f"Missing required files: {missing_files}")
-                
-                # Validate container.xml
-                container = epub.read('META-INF/container.xml')
-                tree = etree.fromstring(container)
-                rootfiles = tree.findall('.//{urn:oasis:names:tc:opendocument:xmlns:container}rootfile')
-                if not rootfiles:
-                    raise StructureError("No rootfiles found in container.xml")
+            if not self._has_member('META-INF/container.xml'):
+                raise StructureError("Missing required files: ['META-INF/container.xml']")
+            
+            # Validate container.xml
+            tree = etree.fromstring(self._get_zip().read('META-INF/container.xml'), _XML_PARSER)
+            rootfiles = tree.findall(_CONTAINER_ROOTFILE)
+            if not rootfiles:
+                raise StructureError("No rootfiles found in container.xml")
+            self._opf_path = rootfiles[0].get('full-path')
                 
         except zipfile.BadZipFile:
+            self.close()
             raise StructureError("File is not a valid ZIP archive")
         except Exception as e:
+            self.close()
             raise StructureError(f"Invalid EPUB structure: {str(e)}")
             
         logger.debug("File validation passed")
     
+    def _get_zip(self) -> zipfile.ZipFile:
+        """Return the EPUB archive, opening it on first use."""
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self._epub_path_str, 'r')
+        return self._zip
+    
+    def _iterparse(self, name: str, **kwargs):
+        """Stream-parse an archive member straight from the decompressor.
+        
+        Large OPF/NCX documents are never held in memory as a whole; the
+        member is closed once iteration finishes.
+        """
+        with self._get_zip().open(name) as fp:
+            yield from etree.iterparse(fp, **kwargs, **_XML_PARSER_OPTIONS)
+    
+    def close(self) -> None:
+        """Close the underlying EPUB archive and drop the parsed OPF package."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        self._opf_package = None
+    
+    def __enter__(self) -> 'EPUBTOCParser':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def __del__(self):
+        # Release the archive handle if close() was never called
+        if getattr(self, '_zip', None) is not None:
+            self._zip.close()
+    
+    def _has_member(self, name: str) -> bool:
+        """Check archive membership with a central-directory lookup."""
+        try:
+            self._get_zip().getinfo(name)
+        except KeyError:
+            return False
+        return True
+    
+    def _find_opf_path(self) -> Optional[str]:
+        """Locate the OPF package document.
+        
+        The rootfile declared in META-INF/container.xml is used directly;
+        the archive listing is only scanned if that entry is missing.
+        """
+        if self._opf_path and self._has_member(self._opf_path):
+            return self._opf_path
+        opf_files = [f for f in self._get_zip().namelist() if f.endswith('.opf')]
+        return opf_files[0] if opf_files else None
+    
+    def _parse_opf(self) -> Optional[Dict]:
+        """Parse the OPF manifest and spine once and cache the result.
+        
+        Returns:
+            Dictionary with the OPF ``path``, ``manifest`` (id -> (href,
+            media type)), ``spine`` idrefs, the spine ``toc`` id and
+            ``has_spine``/``has_manifest``/``has_nav`` flags, or None if
+            there is no OPF
+        """
+        if self._opf_package is not None:
+            return self._opf_package
+        
+        opf_path = self._find_opf_path()
+        if opf_path is None:
+            return None
+        logger.debug("Found OPF file: %s", opf_path)
+        
+        # Stream OPF, collecting only manifest items and spine refs
+        context = self._iterparse(opf_path, events=('end',), tag=_OPF_TAGS)
+        
+        package = {
+            'path': opf_path,
+            'manifest': {},
+            'spine': [],
+            'toc': None,
+            'has_spine': False,
+            'has_manifest': False,
+            'has_nav': False,
+        }
+        for _, elem in context:
+            tag = elem.tag
+            if tag == _OPF_ITEM:
+                item_id = elem.get('id')
+                href = elem.get('href')
+                if item_id and href:
+                    package['manifest'][item_id] = (href, elem.get('media-type'))
+                if 'nav' in (elem.get('properties') or '').split():
+                    package['has_nav'] = True
+            elif tag == _OPF_ITEMREF:
+                package['spine'].append(elem.get('idref'))
+            elif tag == _OPF_SPINE:
+                if not package['has_spine']:
+                    package['toc'] = elem.get('toc')
+                package['has_spine'] = True
+            else:
+                package['has_manifest'] = True
+            
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        
+        self._opf_package = package
+        return package
+    
+    def _find_ncx_path(self) -> Optional[str]:
+        """Locate the NCX document.
+        
+        Follows the OPF spine ``toc`` reference or the manifest item with
+        the NCX media type; the archive listing is only scanned as a
+        fallback for packages that declare neither.
+        """
+        try:
+            package = self._parse_opf()
+        except Exception as e:
+            logger.debug("Could not read OPF while looking for NCX: %s", e)
+            package = None
+        
+        if package:
+            manifest = package['manifest']
+            href = None
+            if package['toc'] in manifest:
+                href = manifest[package['toc']][0]
+            else:
+                for item_href, media_type in manifest.values():
+                    if media_type == _NCX_MEDIA_TYPE:
+                        href = item_href
+                        break
+            if href:
+                opf_dir = posixpath.dirname(package['path'])
+                ncx_path = posixpath.normpath(posixpath.join(opf_dir, unquote(href)))
+                if self._has_member(ncx_path):
+                    return ncx_path
+        
+        ncx_files = [f for f in self._get_zip().namelist() if f.endswith('.ncx')]
+        return ncx_files[0] if ncx_files else None
+    
+    def available_methods(self) -> List[str]:
+        """Return the active methods whose TOC source is present in the EPUB.
+        
+        Uses the cached OPF package, so probing costs a single parse:
+        'ncx' needs an NCX document, 'opf' a spine and manifest, and
+        'epub_meta' an EPUB 3 nav document or an NCX. Methods backed by
+        external tools are kept as they do not depend on the manifest.
+        
+        Returns:
+            Method names in priority order
+        """
+        try:
+            package = self._parse_opf()
+        except Exception as e:
+            logger.debug("Could not read OPF while probing methods: %s", e)
+            package = None
+        
+        has_ncx = self._find_ncx_path() is not None
+        present = {
+            'epub_meta': package is not None and (package['has_nav'] or has_ncx),
+            'ncx': has_ncx,
+            'opf': package is not None and package['has_spine'] and package['has_manifest'],
+        }
+        return [name for name, _ in self.active_methods if present.get(name, True)]
+    
     def extract_toc(self) -> List[Dict]:
         """Extract table of contents using all available methods.
         
@@ -215,47 +481,221 @@ class EPUBTOCParser:
         Raises:
             ExtractionError: If all extraction methods fail
         """
+        # Reuse the previous result while the file is unchanged
+        toc_key = self._file_key()
+        if self._toc_key is not None:
+            if self._toc_key == toc_key and self.toc is not None:
+                logger.debug("Using cached TOC")
+                return self.toc
+            # File changed on disk: drop archive state read from the old one
+            self.close()
+            self._toc_key = None
+            self.extraction_method = None
+            self._method_results.clear()
+            self._epub_meta = None
+        
+        cached = self._load_cached_toc(toc_key)
+        if cached is not None:
+            self.extraction_method, self.toc = cached
+            self._toc_key = toc_key
+            return self.toc
+        
         errors = {}
+        fast_methods = [m for m in self.active_methods if m[0] not in self.SLOW_METHODS]
+        slow_methods = [m for m in self.active_methods if m[0] in self.SLOW_METHODS]
+        
+        # With the default order, read a declared NCX directly before
+        # asking epub_meta, which parses the whole package
+        if self._default_methods and self._find_ncx_path() is not None:
+            fast_methods.sort(key=lambda m: m[0] != 'ncx')
         
-        # Try each extraction method in order
-        for method_name, method_attr in self.EXTRACTION_METHODS:
+        # Try each in-process method in order; methods that were already
+        # called on this parser return their stored result
+        for method_name, method_attr in fast_methods:
+            toc_dicts = self._run_method(method_name, method_attr, errors)
+            if toc_dicts:
+                return self._store_toc(toc_dicts, toc_key, method_name)
+        
+        # The external tools mostly wait on their own processes, so run
+        # them concurrently and keep the highest-priority usable result
+        if slow_methods:
+            executor = ThreadPoolExecutor(max_workers=len(slow_methods))
+            futures = {
+                method_name: executor.submit(self._run_method, method_name, method_attr, errors)
+                for method_name, method_attr in slow_methods
+            }
             try:
-                logger.info(f"Trying extraction method: {method_name}")
-                method = getattr(self, method_attr)
-                result = method()
-                
-                if result and isinstance(result, list) and result:
-                    # Validate TOC structure
-                    self._validate_toc_structure(result)
-                    
-                    # Convert TOCItems to dictionaries
-                    toc_dicts = []
-                    for item in result:
-                        if isinstance(item, TOCItem):
-                            toc_dicts.append(item.to_dict())
-                        else:
-                            logger.warning(f"Invalid TOC item type: {type(item)}")
-                            continue
-                    
-                    if toc_dicts:
-                        logger.info(f"Successfully extracted TOC using {method_name}")
-                        self.toc = toc_dicts  # Store dictionaries instead of TOCItem objects
-                        return toc_dicts
-                    
-            except Exception as e:
-                logger.warning(f"Method {method_name} failed: {str(e)}")
-                errors[method_name] = str(e)
+                for _ in as_completed(futures.values(), timeout=self.SLOW_METHOD_TIMEOUT):
+                    # Stop once no pending method could outrank a success
+                    best = self._best_slow_result(futures)
+                    if best is not None:
+                        return self._store_toc(best[1], toc_key, best[0])
+            except FuturesTimeoutError:
+                for method_name, future in futures.items():
+                    if not future.done():
+                        logger.warning("Method %s timed out", method_name)
+                        errors[method_name] = f"Timed out after {self.SLOW_METHOD_TIMEOUT}s"
+                best = self._best_slow_result(futures, finished_only=True)
+                if best is not None:
+                    return self._store_toc(best[1], toc_key, best[0])
+            finally:
+                # Don't wait for a losing tool; each one is bounded by
+                # SLOW_METHOD_TIMEOUT itself
+                executor.shutdown(wait=False)
         
         # If we get here, no method succeeded
         error_details = "\n".join(f"- {name}: {error}" for name, error in errors.items())
         raise ExtractionError(f"All extraction methods failed:\n{error_details}")
     
+    @staticmethod
+    def _best_slow_result(futures: Dict[str, Future],
+                          finished_only: bool = False) -> Optional[Tuple[str, List[Dict]]]:
+        """Return the highest-priority successful (method_name, toc) pair.
+        
+        futures maps method names to futures in priority order. Unless
+        finished_only is set, None is returned while a method ranked above
+        the first success is still running.
+        """
+        for method_name, future in futures.items():
+            if not future.done():
+                if finished_only:
+                    continue
+                return None
+            toc_dicts = future.result()
+            if toc_dicts:
+                return method_name, toc_dicts
+        return None
+    
+    def _store_toc(self, toc_dicts: List[Dict], toc_key: Tuple[str, int, int],
+                   method_name: str) -> List[Dict]:
+        """Remember an extracted TOC and write it to the cache directory."""
+        self.toc = toc_dicts  # Store dictionaries instead of TOCItem objects
+        self.extraction_method = method_name
+        self._toc_key = toc_key
+        
+        cache_path = self._cache_path(toc_key)
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file first so readers never see
+                # a partial cache entry
+                tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+                entry = {"method": method_name, "toc": toc_dicts}
+                with open(tmp_path, 'wb') as f:
+                    if orjson is not None:
+                        f.write(orjson.dumps(entry))
+                    else:
+                        f.write(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning("Could not write TOC cache %s: %s", cache_path, e)
+        return toc_dicts
+    
+    def _cache_path(self, toc_key: Tuple[str, int, int]) -> Optional[Path]:
+        """Return the cache file for the given file key, if caching is enabled."""
+        if self.cache_dir is None:
+            return None
+        _, mtime_ns, size = toc_key
+        key = f"{self.epub_path.resolve()}:{mtime_ns}:{size}"
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+    
+    def _load_cached_toc(self, toc_key: Tuple[str, int, int]) -> Optional[Tuple[str, List[Dict]]]:
+        """Load a previously extracted TOC from the cache directory.
+        
+        Returns:
+            Tuple of the extraction method name and the TOC, or None
+        """
+        cache_path = self._cache_path(toc_key)
+        if cache_path is None:
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Could not read TOC cache %s: %s", cache_path, e)
+            return None
+        
+        try:
+            entry = orjson.loads(data) if orjson is not None else json.loads(data)
+        except ValueError as e:
+            logger.warning("Ignoring corrupt TOC cache %s: %s", cache_path, e)
+            return None
+        # Entries without a method name are rewritten by the next extraction
+        if not isinstance(entry, dict):
+            return None
+        method_name, toc = entry.get("method"), entry.get("toc")
+        if not isinstance(method_name, str) or not isinstance(toc, list) or not toc:
+            return None
+        logger.debug("Loaded TOC from cache: %s", cache_path)
+        return method_name, toc
+    
+    def _run_method(self, method_name: str, method_attr: str, errors: Dict[str, str]) -> Optional[List[Dict]]:
+        """Run one extraction method and return its validated TOC dictionaries.
+        
+        Failures are logged and recorded in ``errors``; None is returned
+        when the method fails or finds nothing.
+        """
+        try:
+            logger.info("Trying extraction method: %s", method_name)
+            method = getattr(self, method_attr)
+            result = method()
+            
+            if result and isinstance(result, list) and result:
+                # Validate TOC structure and convert TOCItems to
+                # dictionaries in the same walk
+                toc_dicts = self._validate_and_serialize(result)
+                
+                if toc_dicts:
+                    logger.info("Successfully extracted TOC using %s", method_name)
+                    return toc_dicts
+                
+        except Exception as e:
+            logger.warning("Method %s failed: %s", method_name, e)
+            errors[method_name] = str(e)
+        return None
+    
+    def _get_epub_meta(self):
+        """Return epub_meta's result for the file, parsing it only once.
+        
+        The epub_meta extraction method and extract_metadata (called by
+        save_toc_to_json) read the same data.
+        """
+        if self._epub_meta is None:
+            self._epub_meta = get_epub_metadata(self._epub_path_str)
+        return self._epub_meta
+    
+    def _file_key(self) -> Tuple[str, int, int]:
+        """Return (path, mtime_ns, size) identifying the current file contents."""
+        stat = os.stat(self._epub_path_str)
+        return (self._epub_path_str, stat.st_mtime_ns, stat.st_size)
+    
     def _validate_toc_structure(self, toc_items: List[TOCItem]) -> None:
         """Validate TOC structure.
         
         Args:
             toc_items: List of TOC items to validate
             
+        Raises:
+            ValidationError: If structure is invalid
+        """
+        self._validate_and_serialize(toc_items, serialize=False)
+    
+    def _validate_and_serialize(self, toc_items: List[TOCItem],
+                                serialize: bool = True) -> Optional[List[Dict]]:
+        """Validate TOC structure and convert it to dictionaries in one pass.
+        
+        Args:
+            toc_items: List of TOC items to validate
+            serialize: Whether to build the dictionaries; when False the
+                       TOCItem attributes are only checked
+            
+        Returns:
+            List of dictionaries, as produced by TOCItem.to_dict, or None
+            when serialize is False
+            
         Raises:
             ValidationError: If structure is invalid
         """
@@ -264,9 +704,18 @@ class EPUBTOCParser:
             
         if not toc_items:
             logger.warning("TOC is empty")
-            return
-            
-        def validate_item(item: TOCItem, path: str = "root") -> None:
+            return [] if serialize else None
+        
+        # Depth-first walk with an explicit stack, so deep TOCs cannot hit
+        # the recursion limit; entries are (item, path, parent level,
+        # list receiving the item's dict, or None when not serializing)
+        toc_dicts = []
+        stack = [
+            (item, f"item[{i}]", None, toc_dicts)
+            for i, item in reversed(list(enumerate(toc_items)))
+        ]
+        while stack:
+            item, path, parent_level, siblings = stack.pop()
             if not isinstance(item, TOCItem):
                 raise ValidationError(
                     f"{path}: Item must be a TOCItem instance, got {type(item)}"
@@ -282,30 +731,41 @@ class EPUBTOCParser:
             if not isinstance(item.level, int) or item.level < 0:
                 raise ValidationError(f"{path}: Invalid level: {item.level}")
             
+            # Validate level hierarchy
+            if parent_level is not None and item.level <= parent_level:
+                logger.warning(
+                    "%s: Child level (%s) not greater than parent level (%s)",
+                    path, item.level, parent_level
+                )
+            
             # Validate children
             if not isinstance(item.children, list):
                 raise ValidationError(f"{path}: Children must be a list")
-                
-            for i, child in enumerate(item.children):
-                child_path = f"{path}->child[{i}]"
-                validate_item(child, child_path)
-                
-                # Validate level hierarchy
-                if child.level <= item.level:
-                    logger.warning(
-                        f"{child_path}: Child level ({child.level}) not greater "
-                        f"than parent level ({item.level})"
-                    )
+            
+            children = None
+            if serialize:
+                result = {
+                    'title': item.title,
+                    'href': item.href,
+                    'level': item.level,
+                    'children': []
+                }
+                if item.description:
+                    result['description'] = item.description
+                siblings.append(result)
+                children = result['children']
+            
+            for i in range(len(item.children) - 1, -1, -1):
+                stack.append((item.children[i], f"{path}->child[{i}]", item.level, children))
         
-        # Validate each top-level item
-        for i, item in enumerate(toc_items):
-            validate_item(item, f"item[{i}]")
+        return toc_dicts if serialize else None
     
+    @_remember_result('epub_meta')
     def _extract_from_epub_meta(self) -> Optional[List[TOCItem]]:
         """Extract TOC using epub_meta library."""
         try:
             logger.info("Attempting extraction using epub_meta")
-            metadata = get_epub_metadata(str(self.epub_path))
+            metadata = self._get_epub_meta()
             
             if not metadata:
                 logger.warning("No metadata returned from epub_meta")
@@ -316,12 +776,13 @@ class EPUBTOCParser:
                 logger.warning("No TOC found in epub_meta metadata")
                 return None
             
-            logger.debug(f"Found {len(toc)} TOC items in epub_meta")
+            logger.debug("Found %s TOC items in epub_meta", len(toc))
             
             # Convert to our format
             result = []
             current_level = 0
             stack = [(result, -1)]
+            debug = logger.isEnabledFor(logging.DEBUG)
             
             for item in toc:
                 try:
@@ -330,14 +791,15 @@ class EPUBTOCParser:
                     href = item.get('src', '').strip()
                     
                     if not title:
-                        logger.warning(f"Skipping TOC item with empty title: {item}")
+                        logger.warning("Skipping TOC item with empty title: %s", item)
                         continue
                         
                     if not href:
-                        logger.warning(f"Skipping TOC item with empty href: {item}")
+                        logger.warning("Skipping TOC item with empty href: %s", item)
                         continue
                     
-                    logger.debug(f"Processing TOC item: {title} (level {level})")
+                    if debug:
+                        logger.debug("Processing TOC item: %s (level %s)", title, level)
                     
                     while level <= stack[-1][1]:
                         stack.pop()
@@ -347,157 +809,146 @@ class EPUBTOCParser:
                     stack.append((toc_item.children, level))
                     
                 except Exception as e:
-                    logger.warning(f"Failed to process TOC item {item}: {e}")
+                    logger.warning("Failed to process TOC item %s: %s", item, e)
                     continue
             
             if not result:
                 logger.warning("No valid TOC items were extracted")
                 return None
                 
-            logger.info(f"Successfully extracted {len(result)} top-level items using epub_meta")
+            logger.info("Successfully extracted %s top-level items using epub_meta", len(result))
             return result
             
         except Exception as e:
-            logger.warning(f"Failed to extract TOC using epub_meta: {e}")
+            logger.warning("Failed to extract TOC using epub_meta: %s", e)
             return None
     
+    @_remember_result('ncx')
     def _extract_from_ncx(self) -> Optional[List[TOCItem]]:
         """Extract TOC from NCX file."""
         try:
             logger.info("Attempting extraction from NCX")
-            with zipfile.ZipFile(self.epub_path, 'r') as epub:
-                # Find NCX file
-                ncx_files = [f for f in epub.namelist() if f.endswith('.ncx')]
-                if not ncx_files:
-                    logger.warning("No NCX file found in EPUB")
-                    return None
-                
-                ncx_path = ncx_files[0]
-                logger.debug(f"Found NCX file: {ncx_path}")
-                
-                # Parse NCX
-                ncx_content = epub.read(ncx_path)
-                tree = etree.fromstring(ncx_content)
+            # Find NCX file
+            ncx_path = self._find_ncx_path()
+            if ncx_path is None:
+                logger.warning("No NCX file found in EPUB")
+                return None
+            
+            logger.debug("Found NCX file: %s", ncx_path)
+            
+            # Stream NCX: each navPoint is turned into a TOCItem when it
+            # closes, so its children are already built by then
+            context = self._iterparse(ncx_path, events=('start', 'end'), tag=_NCX_NAVPOINT)
+            
+            result = []
+            stack = []  # Children of the currently open navPoints
+            debug = logger.isEnabledFor(logging.DEBUG)
+            for event, nav_point in context:
+                if event == 'start':
+                    stack.append([])
+                    continue
                 
-                # Define namespace
-                ns = {'ncx': 'http://www.daisy.org/z3986/2005/ncx/'}
+                children = stack.pop()
+                level = len(stack)
                 
-                def process_nav_point(nav_point, level=0) -> Optional[TOCItem]:
-                    """Process navigation point recursively."""
-                    # Get title
-                    nav_label = nav_point.find('ncx:navLabel', ns)
-                    text = nav_label.find('ncx:text', ns) if nav_label is not None else None
-                    if text is None or not text.text:
-                        logger.debug(f"Skipping nav point at level {level}: no title")
-                        return None
-                    
+                # Get title
+                titles = _NCX_NAVLABEL_TEXT(nav_point)
+                if not titles:
+                    if debug:
+                        logger.debug("Skipping nav point at level %s: no title", level)
+                    item = None
+                else:
                     # Get content
-                    content = nav_point.find('ncx:content', ns)
-                    href = content.get('src', '') if content is not None else ''
-                    
-                    # Create TOC item first
-                    item = TOCItem(
-                        title=text.text,
-                        href=href,
-                        level=level
-                    )
-                    
-                    # Then process children and add them
-                    for child in nav_point.findall('ncx:navPoint', ns):
-                        child_item = process_nav_point(child, level + 1)
-                        if child_item:
-                            item.children.append(child_item)
-                    
-                    return item
-                
-                # Process all nav points
-                result = []
-                nav_map = tree.find('ncx:navMap', ns)
-                if nav_map is not None:
-                    for nav_point in nav_map.findall('ncx:navPoint', ns):
-                        item = process_nav_point(nav_point)
-                        if item:
-                            result.append(item)
-                
-                if not result:
-                    logger.warning("No valid navigation points found in NCX")
-                    return None
-                
-                logger.info(f"Successfully extracted {len(result)} top-level items from NCX")
-                return result
+                    srcs = _NCX_CONTENT_SRC(nav_point)
+                    href = srcs[0] if srcs else ''
+                    item = TOCItem(title=titles[0], href=href, level=level)
+                    item.children.extend(children)
                 
+                if stack:
+                    if item:
+                        stack[-1].append(item)
+                    nav_point.clear()
+                else:
+                    if item:
+                        result.append(item)
+                    # Drop finished top-level subtrees to bound memory
+                    nav_point.clear()
+                    while nav_point.getprevious() is not None:
+                        del nav_point.getparent()[0]
+            
+            if not result:
+                logger.warning("No valid navigation points found in NCX")
+                return None
+            
+            logger.info("Successfully extracted %s top-level items from NCX", len(result))
+            return result
+            
+        except etree.XMLSyntaxError as e:
+            logger.warning("Malformed NCX document: %s", e)
+            return None
         except Exception as e:
-            logger.warning(f"Failed to extract TOC from NCX: {e}")
+            logger.warning("Failed to extract TOC from NCX: %s", e)
             return None
     
+    @_remember_result('opf')
     def _extract_from_opf(self) -> Optional[List[TOCItem]]:
         """Extract TOC from OPF file."""
         try:
             logger.info("Attempting extraction from OPF")
-            with zipfile.ZipFile(self.epub_path, 'r') as epub:
-                # Find OPF file
-                opf_files = [f for f in epub.namelist() if f.endswith('.opf')]
-                if not opf_files:
-                    logger.warning("No OPF file found in EPUB")
-                    return None
-                
-                opf_path = opf_files[0]
-                logger.debug(f"Found OPF file: {opf_path}")
-                
-                # Parse OPF
-                opf_content = epub.read(opf_path)
-                tree = etree.fromstring(opf_content)
-                
-                # Find spine and manifest
-                spine = tree.find('.//{http://www.idpf.org/2007/opf}spine')
-                manifest = tree.find('.//{http://www.idpf.org/2007/opf}manifest')
-                
-                if spine is None or manifest is None:
-                    logger.warning("No spine or manifest found in OPF")
-                    return None
-                
-                # Create id -> href mapping
-                id_to_href = {}
-                for item in manifest.findall('.//{http://www.idpf.org/2007/opf}item'):
-                    item_id = item.get('id')
-                    href = item.get('href')
-                    if item_id and href:
-                        id_to_href[item_id] = href
-                
-                # Extract structure from spine
-                result = []
-                for i, itemref in enumerate(spine.findall('.//{http://www.idpf.org/2007/opf}itemref')):
-                    idref = itemref.get('idref')
-                    if idref in id_to_href:
-                        result.append(TOCItem(
-                            title=f'Chapter {i+1}',
-                            href=id_to_href[idref],
-                            level=0
-                        ))
-                
-                if not result:
-                    logger.warning("No valid items found in OPF spine")
-                    return None
-                
-                logger.info(f"Successfully extracted {len(result)} items from OPF")
-                return result
-                
+            package = self._parse_opf()
+            if package is None:
+                logger.warning("No OPF file found in EPUB")
+                return None
+            
+            if not package['has_spine'] or not package['has_manifest']:
+                logger.warning("No spine or manifest found in OPF")
+                return None
+            
+            # Extract structure from spine
+            manifest = package['manifest']
+            result = []
+            for i, idref in enumerate(package['spine']):
+                if idref in manifest:
+                    result.append(TOCItem(
+                        title=f'Chapter {i+1}',
+                        href=manifest[idref][0],
+                        level=0
+                    ))
+            
+            if not result:
+                logger.warning("No valid items found in OPF spine")
+                return None
+            
+            logger.info("Successfully extracted %s items from OPF", len(result))
+            return result
+            
+        except etree.XMLSyntaxError as e:
+            logger.warning("Malformed OPF document: %s", e)
+            return None
         except Exception as e:
-            logger.warning(f"Failed to extract TOC from OPF: {e}")
+            logger.warning("Failed to extract TOC from OPF: %s", e)
             return None
     
+    @_remember_result('ebooklib')
     def _extract_from_ebooklib(self) -> Optional[List[TOCItem]]:
         """Extract TOC using ebooklib."""
         try:
             logger.info("Attempting extraction using ebooklib")
-            book = epub.read_epub(str(self.epub_path))
+            # Imported here: only needed when the faster methods fail
+            from ebooklib import epub
+            book = epub.read_epub(self._epub_path_str)
             toc = book.toc
             
             if not toc:
                 logger.warning("No TOC found in ebooklib")
                 return None
             
-            def process_toc_item(item, level=0) -> TOCItem:
+            # Walk the nested (section, children) tuples with an explicit
+            # stack; entries are (item, level, list to append the result to)
+            result = []
+            stack = deque((item, 0, result) for item in reversed(toc))
+            while stack:
+                item, level, siblings = stack.pop()
                 if isinstance(item, tuple):
                     # Handle tuple format (section, items)
                     section, children = item
@@ -507,35 +958,36 @@ class EPUBTOCParser:
                     # Handle single item
                     title = item.title
                     href = item.href or ''
-                    children = []
+                    children = ()
                 
                 toc_item = TOCItem(title=title, href=href, level=level)
-                
-                # Process children recursively
-                if isinstance(item, tuple):
-                    toc_item.children = [process_toc_item(child, level+1) 
-                                       for child in children]
-                
-                return toc_item
-                
-            result = [process_toc_item(item) for item in toc]
+                siblings.append(toc_item)
+                stack.extend(
+                    (child, level + 1, toc_item.children)
+                    for child in reversed(children)
+                )
             
             if not result:
                 logger.warning("No valid items found in ebooklib TOC")
                 return None
             
-            logger.info(f"Successfully extracted {len(result)} top-level items using ebooklib")
+            logger.info("Successfully extracted %s top-level items using ebooklib", len(result))
             return result
             
         except Exception as e:
-            logger.warning(f"Failed to extract TOC using ebooklib: {e}")
+            logger.warning("Failed to extract TOC using ebooklib: %s", e)
             return None
     
+    @_remember_result('tika')
     def _extract_from_tika(self) -> Optional[List[TOCItem]]:
         """Extract TOC using Apache Tika."""
         try:
             logger.info("Attempting extraction using Tika")
-            parsed = tika_parser.from_file(str(self.epub_path))
+            from tika import parser as tika_parser
+            parsed = tika_parser.from_file(
+                self._epub_path_str,
+                requestOptions={'timeout': self.SLOW_METHOD_TIMEOUT}
+            )
             metadata = parsed.get('metadata', {})
             
             if not metadata or 'toc' not in metadata:
@@ -561,22 +1013,24 @@ class EPUBTOCParser:
                 logger.warning("No valid items found in Tika TOC")
                 return None
             
-            logger.info(f"Successfully extracted {len(result)} top-level items using Tika")
+            logger.info("Successfully extracted %s top-level items using Tika", len(result))
             return result
             
         except Exception as e:
-            logger.warning(f"Failed to extract TOC using Tika: {e}")
+            logger.warning("Failed to extract TOC using Tika: %s", e)
             return None
     
+    @_remember_result('calibre')
     def _extract_from_calibre(self) -> Optional[List[TOCItem]]:
         """Extract TOC using Calibre's ebook-meta tool."""
         try:
             logger.info("Attempting extraction using Calibre")
             result = subprocess.run(
-                ['ebook-meta', str(self.epub_path), '--get-toc'],
+                ['ebook-meta', self._epub_path_str, '--get-toc'],
                 capture_output=True,
                 text=True,
-                check=True
+                check=True,
+                timeout=self.SLOW_METHOD_TIMEOUT
             )
             
             if not result.stdout.strip():
@@ -584,22 +1038,17 @@ class EPUBTOCParser:
                 return None
             
             # Parse Calibre's output format
-            lines = result.stdout.strip().split('\n')
+            lines = result.stdout.strip().splitlines()
             result = []
             stack = [(result, -1)]
             
             for line in lines:
-                if not line.strip():
+                # One match yields indentation, title and href
+                indent, title, href = _CALIBRE_TOC_LINE.match(line).groups()
+                if not title:
                     continue
-                    
-                # Calculate indentation level
-                level = len(line) - len(line.lstrip())
-                line = line.strip()
-                
-                # Extract title and href
-                parts = line.split(' -> ')
-                title = parts[0].strip()
-                href = parts[1].strip() if len(parts) > 1 else ''
+                level = len(indent)
+                href = href or ''
                 
                 # Create TOC item
                 while level <= stack[-1][1]:
@@ -613,17 +1062,17 @@ class EPUBTOCParser:
                 logger.warning("No valid items found in Calibre TOC")
                 return None
             
-            logger.info(f"Successfully extracted {len(result)} top-level items using Calibre")
+            logger.info("Successfully extracted %s top-level items using Calibre", len(result))
             return result
             
         except Exception as e:
-            logger.warning(f"Failed to extract TOC using Calibre: {e}")
+            logger.warning("Failed to extract TOC using Calibre: %s", e)
             return None
     
     def extract_metadata(self) -> dict:
         """Extract metadata from EPUB file."""
         try:
-            metadata = get_epub_metadata(str(self.epub_path))
+            metadata = self._get_epub_meta()
             return {
                 "title": metadata.get('title'),
                 "authors": metadata.get('authors', []),
@@ -638,19 +1087,25 @@ class EPUBTOCParser:
                 "series_index": metadata.get('series_index'),
                 "identifiers": metadata.get('identifiers', {}),
                 "subjects": metadata.get('subjects', []),
-                "file_size": Path(self.epub_path).stat().st_size if self.epub_path else None,
-                "file_name": Path(self.epub_path).name if self.epub_path else None
+                "file_size": self.epub_path.stat().st_size if self.epub_path else None,
+                "file_name": self.epub_path.name if self.epub_path else None
             }
         except Exception as e:
-            logger.warning(f"Failed to extract metadata: {e}")
+            logger.warning("Failed to extract metadata: %s", e)
             return {}
     
-    def save_toc_to_json(self, output_path: Union[str, Path], metadata: Dict = None) -> None:
+    def save_toc_to_json(self, output_path: Union[str, Path], metadata: Dict = None,
+                         indent: Optional[int] = 4) -> None:
         """Save TOC to JSON file with enhanced formatting and metadata.
         
+        The file content does not depend on whether orjson is installed;
+        orjson is only used for the layouts it writes byte for byte like
+        the json module (indent=2 or compact).
+        
         Args:
             output_path: Path where to save the JSON file
             metadata: Optional metadata to include in the output
+            indent: Spaces per indentation level, or None for compact output
             
         Raises:
             OutputError: If saving fails
@@ -662,23 +1117,27 @@ class EPUBTOCParser:
         output_path = Path(output_path)
         metadata = metadata or self.extract_metadata()
         
-        # Convert TOC items to dictionaries if they are TOCItem objects
-        toc_data = []
-        for item in self.toc:
-            if isinstance(item, TOCItem):
-                toc_data.append(item.to_dict())
-            elif isinstance(item, dict):
-                toc_data.append(item)
-            else:
-                logger.warning(f"Unexpected TOC item type: {type(item)}")
-                continue
+        # extract_toc already stores dictionaries; only convert TOCItem
+        # objects assigned to self.toc directly
+        if all(isinstance(item, dict) for item in self.toc):
+            toc_data = self.toc
+        else:
+            toc_data = []
+            for item in self.toc:
+                if isinstance(item, TOCItem):
+                    toc_data.append(item.to_dict())
+                elif isinstance(item, dict):
+                    toc_data.append(item)
+                else:
+                    logger.warning("Unexpected TOC item type: %s", type(item))
+                    continue
 
         # Prepare output data with simplified structure
         data = {
             "metadata": {
                 "title": metadata.get("title"),
                 "authors": metadata.get("authors", []),
-                "file_name": str(self.epub_path.name),
+                "file_name": self.epub_path.name,
                 "file_size": self.epub_path.stat().st_size if self.epub_path.exists() else None,
                 "publisher": metadata.get("publisher"),
                 "language": metadata.get("language"),
@@ -690,10 +1149,17 @@ class EPUBTOCParser:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Save to file with nice formatting
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False, default=str)
+        if orjson is not None and indent in (None, 2):
+            option = orjson.OPT_INDENT_2 if indent == 2 else None
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(data, default=str, option=option))
+        else:
+            separators = (',', ':') if indent is None else None
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=indent, separators=separators,
+                          ensure_ascii=False, default=str)
         
-        logger.info(f"Saved TOC with metadata to: {output_path}")
+        logger.info("Saved TOC with metadata to: %s", output_path)
     
     def print_toc(self):
         """Print extracted TOC to console.
@@ -704,11 +1170,21 @@ class EPUBTOCParser:
         if not self.toc:
             raise ValidationError("TOC not extracted")
         
-        def print_item(item: TOCItem, level: int = 0):
-            print('  ' * level + f'- {item.title}')
-            for child in item.children:
-                print_item(child, level + 1)
+        # Build the listing in one buffer and write it once; items may be
+        # the dictionaries stored by extract_toc or TOCItem objects
+        out = io.StringIO()
+        out.write("\nTable of Contents:\n")
+        indents = ['']
+        stack = [(item, 0) for item in reversed(self.toc)]
+        while stack:
+            item, level = stack.pop()
+            if isinstance(item, dict):
+                title, children = item.get('title'), item.get('children') or []
+            else:
+                title, children = item.title, item.children
+            while len(indents) <= level:
+                indents.append(indents[-1] + '  ')
+            out.write(f"{indents[level]}- {title}\n")
+            stack.extend((child, level + 1) for child in reversed(children))
         
-        print("\nTable of Contents:")
-        for item in self.toc:
-            print_item(item) 
\ No newline at end of file
+        sys.stdout.write(out.getvalue())
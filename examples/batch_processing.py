@@ -2,9 +2,26 @@
 """Example of batch processing multiple EPUB files."""
 
 import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from epub_toc import EPUBTOCParser, ExtractionError
 
+try:
+    import orjson
+except ImportError:  # pip install epub_toc[fast]
+    orjson = None
+
+def write_json(path, obj):
+    """Write obj as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+
 def process_epub_file(epub_path):
     """Process a single EPUB file and return its TOC."""
     try:
@@ -22,6 +39,11 @@ def process_epub_file(epub_path):
             'error': str(e)
         }
 
+def init_worker():
+    """Configure logging once per worker process."""
+    # Workers only need to report problems
+    logging.getLogger('epub_toc').setLevel(logging.WARNING)
+
 def batch_process_directory(input_dir, output_dir):
     """Process all EPUB files in a directory."""
     input_path = Path(input_dir)
@@ -32,40 +54,48 @@ def batch_process_directory(input_dir, output_dir):
     epub_files = list(input_path.glob('**/*.epub'))
     print(f"Found {len(epub_files)} EPUB files to process")
     
-    # Process each file
-    results = {}
-    for epub_file in epub_files:
-        print(f"\nProcessing: {epub_file.name}")
-        result = process_epub_file(epub_file)
-        
-        # Save individual TOC if extraction succeeded
-        if result['status'] == 'success':
-            output_file = output_path / f"{epub_file.stem}_toc.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result['toc'], f, ensure_ascii=False, indent=2)
-            print(f"Saved TOC to: {output_file}")
-        else:
-            print(f"Failed to extract TOC: {result['error']}")
-        
-        # Store result
-        results[epub_file.name] = result
+    # Parse files in parallel, handing each worker a batch of paths at a
+    # time; results come back in input order and are written from here.
+    # A single worker is still a separate process, so init_worker never
+    # changes this process's logging
+    workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    chunksize = max(1, min(64, len(epub_files) // (workers * 4)))
+    
+    # Only status/error per file is kept; each TOC is written and dropped
+    statuses = {}
+    successful = failed = 0
+    with executor:
+        paths = [str(epub_file) for epub_file in epub_files]
+        results = executor.map(process_epub_file, paths, chunksize=chunksize)
+        for epub_file, result in zip(epub_files, results):
+            print(f"\nProcessed: {epub_file.name}")
+            
+            # Save individual TOC if extraction succeeded
+            if result['status'] == 'success':
+                output_file = output_path / f"{epub_file.stem}_toc.json"
+                write_json(output_file, result['toc'])
+                print(f"Saved TOC to: {output_file}")
+                successful += 1
+            else:
+                print(f"Failed to extract TOC: {result['error']}")
+                failed += 1
+            
+            # Store result
+            statuses[epub_file.name] = {
+                'status': result['status'],
+                'error': result['error']
+            }
     
     # Save summary report
     report_file = output_path / 'processing_report.json'
-    with open(report_file, 'w', encoding='utf-8') as f:
-        summary = {
-            'total_files': len(epub_files),
-            'successful': sum(1 for r in results.values() if r['status'] == 'success'),
-            'failed': sum(1 for r in results.values() if r['status'] == 'error'),
-            'results': {
-                name: {
-                    'status': result['status'],
-                    'error': result['error']
-                }
-                for name, result in results.items()
-            }
-        }
-        json.dump(summary, f, ensure_ascii=False, indent=2)
+    summary = {
+        'total_files': len(epub_files),
+        'successful': successful,
+        'failed': failed,
+        'results': statuses
+    }
+    write_json(report_file, summary)
     print(f"\nSaved processing report to: {report_file}")
 
 def main():
@@ -6,10 +6,27 @@ Examples use both online and local EPUB files.
 
 from epub_toc import EPubTOC
 import json
+import sys
+
+try:
+    import orjson
+except ImportError:  # pip install epub_toc[fast]
+    orjson = None
 
 def print_json(data):
     """Helper function to print JSON in a readable format"""
-    print(json.dumps(data, indent=2, ensure_ascii=False))
+    if orjson is not None:
+        output = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        buffer = getattr(sys.stdout, 'buffer', None)
+        if buffer is not None:
+            # Write the UTF-8 bytes directly, after any pending text output
+            sys.stdout.flush()
+            buffer.write(output + b'\n')
+        else:
+            # Replaced stdout (io.StringIO, IDE consoles) only accepts text
+            sys.stdout.write(output.decode() + '\n')
+    else:
+        print(json.dumps(data, indent=2, ensure_ascii=False))
 
 # Example 1: Online EPUB from Project Gutenberg
 print("\n=== Pride and Prejudice (Project Gutenberg) ===")
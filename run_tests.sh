@@ -17,6 +17,8 @@ declare -A test_categories=(
 
 # JSON directory setup
 JSON_DIR="tests/data/epub_toc_json"
+# test_json_export writes to a temporary directory; keep copies for the dashboard
+export KEEP_TOC_JSON=1
 
 # Strategy counters
 declare -A strategy_success=( ["ncx"]=0 ["nav"]=0 ["landmarks"]=0 ["fallback"]=0 )
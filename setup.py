@@ -30,6 +30,12 @@ setup(
         "tika>=2.6",
     ],
     extras_require={
+        "fast": [
+            "orjson>=3.9",
+        ],
+        "watch": [
+            "watchdog>=2.1",
+        ],
         "dev": [
             "pytest>=7.4.3",
             "pytest-cov>=4.1.0",
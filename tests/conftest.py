@@ -2,29 +2,95 @@
 
 import pytest
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from epub_toc import EPUBTOCParser
+from tests.helpers import list_sample_epubs
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def setup_logging():
-    """Configure logging for tests."""
+    """Configure logging once for the test session."""
     logging.basicConfig(
         level=logging.DEBUG,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         force=True
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def data_dir():
     """Return path to test data directory."""
     return Path(__file__).parent / "data"
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def epub_samples_dir(data_dir):
     """Return path to EPUB samples directory."""
     samples_dir = data_dir / "epub_samples"
     samples_dir.mkdir(parents=True, exist_ok=True)
     return samples_dir
 
+@pytest.fixture(scope="session")
+def sample_epub_files(epub_samples_dir):
+    """Return the sample EPUB files, skipping the test if there are none."""
+    files = list_sample_epubs(epub_samples_dir)
+    if not files:
+        pytest.skip("No EPUB files found in test directory")
+    return files
+
+def _extract_toc(epub_file):
+    """Return a parser after extract_toc(), or the exception it raised."""
+    try:
+        parser = EPUBTOCParser(epub_file)
+        parser.extract_toc()
+        return parser
+    except Exception as e:
+        return e
+
+@pytest.fixture(scope="session")
+def parsed_epubs(epub_samples_dir):
+    """Extract the TOC of every sample EPUB once per session.
+    
+    Maps each file to its parser after extract_toc(), or to the exception
+    the extraction raised.
+    """
+    files = list_sample_epubs(epub_samples_dir)
+    # Unzipping and XML parsing largely run outside the GIL, so the
+    # samples are extracted concurrently
+    with ThreadPoolExecutor(max_workers=max(1, min(len(files), os.cpu_count() or 1))) as executor:
+        parsed = dict(zip(files, executor.map(_extract_toc, files)))
+    yield parsed
+    for parser in parsed.values():
+        if isinstance(parser, EPUBTOCParser):
+            parser.close()
+
+@pytest.fixture(scope="session")
+def sample_metadata(parsed_epubs):
+    """Extract the metadata of every sample EPUB once per session.
+    
+    Maps each file to its extract_metadata() result, or to the exception
+    raised while opening it. Metadata does not depend on TOC extraction
+    having succeeded.
+    """
+    metadata = {}
+    for epub_file, parser in parsed_epubs.items():
+        try:
+            if not isinstance(parser, EPUBTOCParser):
+                with EPUBTOCParser(epub_file) as parser:
+                    metadata[epub_file] = parser.extract_metadata()
+            else:
+                metadata[epub_file] = parser.extract_metadata()
+        except Exception as e:
+            metadata[epub_file] = e
+    return metadata
+
+@pytest.fixture
+def sample_toc(epub_file, parsed_epubs):
+    """Return the session's extracted TOC for the parametrized epub_file."""
+    parser = parsed_epubs[epub_file]
+    if isinstance(parser, Exception):
+        raise parser
+    return parser.toc
+
 @pytest.fixture
 def temp_epub(tmp_path):
     """Create a temporary EPUB file for testing."""
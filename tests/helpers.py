@@ -0,0 +1,22 @@
+"""Helpers shared by the test modules and conftest."""
+
+import os
+from pathlib import Path
+
+SAMPLES_DIR = Path(__file__).parent / "data" / "epub_samples"
+
+def list_sample_epubs(samples_dir=SAMPLES_DIR):
+    """Return the EPUB files in a directory, sorted by path.
+    
+    The single source of the sample list: conftest's session fixtures
+    and the test modules' parametrization use it, so they always see
+    the same files. Symlinks are skipped.
+    """
+    if not os.path.isdir(samples_dir):
+        return ()
+    # DirEntry.is_file() answers from the directory listing, without a stat()
+    with os.scandir(samples_dir) as entries:
+        return tuple(sorted(
+            Path(entry.path) for entry in entries
+            if entry.name.endswith(".epub") and entry.is_file(follow_symlinks=False)
+        ))
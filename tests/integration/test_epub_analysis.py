@@ -1,52 +1,113 @@
 """Integration tests for EPUB analysis functionality."""
 
 import json
+import os
 import pytest
-import shutil
-from pathlib import Path
 from datetime import datetime
-from epub_toc import EPUBTOCParser
 
-def test_epub_analysis(epub_samples_dir):
-    """Test analysis of EPUB files."""
-    epub_files = [f for f in epub_samples_dir.glob("*.epub") if f.is_file()]
-    if not epub_files:
-        pytest.skip("No EPUB files found in test directory")
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def get_depth(items):
+    """Return the maximum nesting depth of a TOC, walking it with a stack."""
+    max_depth = 0
+    stack = [(items, 0)]
+    while stack:
+        items, depth = stack.pop()
+        max_depth = max(max_depth, depth)
+        for item in items:
+            if item.get("children"):
+                stack.append((item["children"], depth + 1))
+    return max_depth
+
+def _toc_columns(toc):
+    """Split the top-level TOC items into title, href, level and children lists."""
+    titles, hrefs, levels, children = [], [], [], []
+    for item in toc:
+        titles.append(item["title"])
+        hrefs.append(item["href"])
+        levels.append(item["level"])
+        children.append(item["children"])
+    return titles, hrefs, levels, children
+
+def _check_epub(epub_file, parser):
+    """Validate the extracted TOC of one file; return an error or None."""
+    try:
+        if isinstance(parser, Exception):
+            raise parser
+        toc = parser.toc
+        
+        # Basic validation
+        assert isinstance(toc, list), f"TOC for {epub_file.name} is not a list"
+        assert len(toc) > 0, f"TOC for {epub_file.name} is empty"
+        
+        # Structure validation, one column at a time
+        for item in toc:
+            assert "title" in item, f"Missing title in TOC item for {epub_file.name}"
+            assert "href" in item, f"Missing href in TOC item for {epub_file.name}"
+            assert "level" in item, f"Missing level in TOC item for {epub_file.name}"
+        titles, hrefs, levels, children = _toc_columns(toc)
+        assert all(isinstance(c, list) for c in children), f"Children not a list in TOC item for {epub_file.name}"
+        assert all(t.strip() for t in titles), f"Empty title in TOC item for {epub_file.name}"
+        assert all(h.strip() for h in hrefs), f"Empty href in TOC item for {epub_file.name}"
+        assert all(isinstance(l, int) for l in levels), f"Level not an integer in TOC item for {epub_file.name}"
+        assert all(l >= 0 for l in levels), f"Negative level in TOC item for {epub_file.name}"
+        
+    except Exception as e:
+        return str(e)
+    return None
+
+def _analyze_epub(epub_file, parser, output_prefix):
+    """Return the report entry for one file's extracted TOC.
     
-    success_count = 0
-    failed_files = []
+    output_prefix is the TOC output directory as a string ending in os.sep.
+    """
+    result = {
+        "file_name": epub_file.name,
+        "file_size": epub_file.stat().st_size / 1024,  # KB
+        "success": False,
+        "extraction_method": None,
+        "toc_items": 0,
+        "max_depth": 0,
+        "error": None,
+        "toc_file": None,
+        "validation_errors": []
+    }
     
-    for epub_file in epub_files:
-        try:
-            parser = EPUBTOCParser(epub_file)
-            toc = parser.extract_toc()
-            
-            # Basic validation
-            assert isinstance(toc, list), f"TOC for {epub_file.name} is not a list"
-            assert len(toc) > 0, f"TOC for {epub_file.name} is empty"
+    try:
+        if isinstance(parser, Exception):
+            raise parser
+        toc = parser.toc
+        
+        if toc:
+            result["success"] = True
+            result["extraction_method"] = parser.extraction_method
+            result["toc_items"] = len(toc)
             
-            # Structure validation
-            for item in toc:
-                assert "title" in item, f"Missing title in TOC item for {epub_file.name}"
-                assert "href" in item, f"Missing href in TOC item for {epub_file.name}"
-                assert "level" in item, f"Missing level in TOC item for {epub_file.name}"
-                assert isinstance(item["children"], list), f"Children not a list in TOC item for {epub_file.name}"
-                
-                # Validate title
-                assert item["title"].strip(), f"Empty title in TOC item for {epub_file.name}"
-                
-                # Validate href
-                assert item["href"].strip(), f"Empty href in TOC item for {epub_file.name}"
-                
-                # Validate level
-                assert isinstance(item["level"], int), f"Level not an integer in TOC item for {epub_file.name}"
-                assert item["level"] >= 0, f"Negative level in TOC item for {epub_file.name}"
+            result["max_depth"] = get_depth(toc)
             
-            success_count += 1
+            # Save TOC to JSON
+            toc_name = f"{epub_file.stem}_toc.json"
+            parser.save_toc_to_json(output_prefix + toc_name)
+            result["toc_file"] = toc_name
             
-        except Exception as e:
-            failed_files.append((epub_file.name, str(e)))
-            continue
+    except Exception as e:
+        result["error"] = str(e)
+        result["validation_errors"].append(str(e))
+    
+    return result
+
+def test_epub_analysis(parsed_epubs):
+    """Test analysis of EPUB files."""
+    if not parsed_epubs:
+        pytest.skip("No EPUB files found in test directory")
+    
+    errors = {f: _check_epub(f, parser) for f, parser in parsed_epubs.items()}
+    
+    success_count = sum(1 for error in errors.values() if error is None)
+    failed_files = [(f.name, error) for f, error in errors.items() if error]
     
     # Report failures
     if failed_files:
@@ -56,10 +117,9 @@ def test_epub_analysis(epub_samples_dir):
     
     assert success_count > 0, f"No files were successfully processed. Failed files: {failed_files}"
 
-def test_epub_analysis_with_report(epub_samples_dir, tmp_path):
+def test_epub_analysis_with_report(parsed_epubs, tmp_path):
     """Test EPUB analysis with detailed report and JSON export."""
-    epub_files = [f for f in epub_samples_dir.glob("*.epub") if f.is_file()]
-    if not epub_files:
+    if not parsed_epubs:
         pytest.skip("No EPUB files found in test directory")
     
     # Create output directories
@@ -69,90 +129,62 @@ def test_epub_analysis_with_report(epub_samples_dir, tmp_path):
     report_dir = tmp_path / "reports"
     report_dir.mkdir(exist_ok=True)
     
-    results = []
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    for epub_file in epub_files:
-        result = {
-            "file_name": epub_file.name,
-            "file_size": epub_file.stat().st_size / 1024,  # KB
-            "success": False,
-            "extraction_method": None,
-            "toc_items": 0,
-            "max_depth": 0,
-            "error": None,
-            "toc_file": None,
-            "validation_errors": []
-        }
-        
-        try:
-            parser = EPUBTOCParser(epub_file)
-            toc = parser.extract_toc()
-            
-            if toc:
-                result["success"] = True
-                result["extraction_method"] = parser.extraction_method
-                result["toc_items"] = len(toc)
-                
-                # Calculate max depth
-                def get_depth(items, current_depth=0):
-                    max_depth = current_depth
-                    for item in items:
-                        if "children" in item and item["children"]:
-                            child_depth = get_depth(item["children"], current_depth + 1)
-                            max_depth = max(max_depth, child_depth)
-                    return max_depth
-                
-                result["max_depth"] = get_depth(toc)
-                
-                # Save TOC to JSON
-                toc_file = output_dir / f"{epub_file.stem}_toc.json"
-                parser.save_toc_to_json(toc_file)
-                result["toc_file"] = toc_file.name
-                
-        except Exception as e:
-            result["error"] = str(e)
-            result["validation_errors"].append(str(e))
-        
-        results.append(result)
+    # TOCs were extracted once for the session by the parsed_epubs fixture
+    output_prefix = str(output_dir) + os.sep
+    results = [
+        _analyze_epub(epub_file, parser, output_prefix)
+        for epub_file, parser in parsed_epubs.items()
+    ]
     
-    # Generate report
+    # Generate report; compact unless EPUB_TOC_PRETTY is set, the text
+    # report below is the human-readable one
+    pretty = bool(os.environ.get("EPUB_TOC_PRETTY"))
     report_file = report_dir / f"epub_analysis_{timestamp}.json"
-    with open(report_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        report_file.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2 if pretty else None))
+    else:
+        with open(report_file, "w", encoding="utf-8") as f:
+            if pretty:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+            else:
+                json.dump(results, f, ensure_ascii=False, separators=(',', ':'))
+    
+    # Generate text report, written in one go
+    successful, failed = [], []
+    for r in results:
+        (successful if r["success"] else failed).append(r)
+    
+    parts = [
+        "EPUB TOC Analysis Report\n",
+        "=" * 50 + "\n\n",
+        f"Total files analyzed: {len(results)}\n"
+        f"Successfully processed: {len(successful)}\n"
+        f"Failed: {len(failed)}\n\n",
+    ]
+    
+    if successful:
+        parts.append("\nSuccessful extractions:\n" + "-" * 30 + "\n")
+        for r in successful:
+            parts.append(
+                f"\nFile: {r['file_name']}\n"
+                f"Method: {r['extraction_method']}\n"
+                f"TOC items: {r['toc_items']}\n"
+                f"Max depth: {r['max_depth']}\n"
+                f"TOC file: {r['toc_file']}\n"
+            )
+    
+    if failed:
+        parts.append("\nFailed extractions:\n" + "-" * 30 + "\n")
+        for r in failed:
+            parts.append(f"\nFile: {r['file_name']}\nError: {r['error']}\n")
+            if r["validation_errors"]:
+                parts.append("Validation errors:\n")
+                parts.extend(f"- {err}\n" for err in r["validation_errors"])
     
-    # Generate text report
     text_report = report_dir / f"epub_analysis_{timestamp}.txt"
     with open(text_report, "w", encoding="utf-8") as f:
-        f.write("EPUB TOC Analysis Report\n")
-        f.write("=" * 50 + "\n\n")
-        
-        successful = [r for r in results if r["success"]]
-        failed = [r for r in results if not r["success"]]
-        
-        f.write(f"Total files analyzed: {len(results)}\n")
-        f.write(f"Successfully processed: {len(successful)}\n")
-        f.write(f"Failed: {len(failed)}\n\n")
-        
-        if successful:
-            f.write("\nSuccessful extractions:\n")
-            f.write("-" * 30 + "\n")
-            for r in successful:
-                f.write(f"\nFile: {r['file_name']}\n")
-                f.write(f"Method: {r['extraction_method']}\n")
-                f.write(f"TOC items: {r['toc_items']}\n")
-                f.write(f"Max depth: {r['max_depth']}\n")
-                f.write(f"TOC file: {r['toc_file']}\n")
-        
-        if failed:
-            f.write("\nFailed extractions:\n")
-            f.write("-" * 30 + "\n")
-            for r in failed:
-                f.write(f"\nFile: {r['file_name']}\n")
-                f.write(f"Error: {r['error']}\n")
-                if r["validation_errors"]:
-                    f.write("Validation errors:\n")
-                    for err in r["validation_errors"]:
-                        f.write(f"- {err}\n")
+        f.write("".join(parts))
     
     assert len(successful) > 0, "No successful extractions" 
\ No newline at end of file
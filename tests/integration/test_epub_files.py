@@ -4,26 +4,31 @@ import pytest
 from pathlib import Path
 from epub_toc import (
     EPUBTOCParser,
-    TOCItem,
-    ValidationError,
-    ExtractionError
+    ValidationError
 )
+from tests.helpers import list_sample_epubs
 import json
+import operator
 import os
 import shutil
 
-# Fixture for test EPUB files directory
-@pytest.fixture
-def epub_samples_dir():
-    """Return path to directory with test EPUB files."""
-    return Path(__file__).parent.parent / "data" / "epub_samples"
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@pytest.fixture
-def test_output_dir():
-    """Return path to epub_toc_json directory."""
-    output_dir = Path(__file__).parent.parent / "data" / "epub_toc_json"
-    output_dir.mkdir(exist_ok=True)
-    return output_dir
+# Collected at import time so every sample is its own test case, which
+# pytest-xdist (pytest -n auto) can spread across worker processes
+SAMPLE_EPUBS = list_sample_epubs()
+requires_samples = pytest.mark.skipif(not SAMPLE_EPUBS, reason="Test EPUB files not available")
+
+_toc_fields = operator.itemgetter("title", "href", "level")
+
+REQUIRED_METADATA = ("title", "authors", "file_name")  # file_size is optional
+
+# Exported TOCs are written under tmp_path; set KEEP_TOC_JSON to also
+# copy them here for inspection (run_tests.sh does)
+KEPT_JSON_DIR = Path(__file__).parent.parent / "data" / "epub_toc_json"
 
 def validate_toc_structure(data, filename=""):
     """Validate TOC structure against schema.
@@ -116,184 +121,151 @@ def validate_toc_structure(data, filename=""):
     
     return errors
 
+def _validate_subtree(children, name):
+    """Check every descendant TOC item, walking the tree with a stack."""
+    stack = list(children)
+    while stack:
+        child = stack.pop()
+        assert isinstance(child, dict), f"Child TOC item should be a dictionary in {name}"
+        assert "title" in child, f"Child TOC item missing title in {name}"
+        assert "href" in child, f"Child TOC item missing href in {name}"
+        assert "level" in child, f"Child TOC item missing level in {name}"
+        assert isinstance(child["title"], (str, type(None))), f"Child title should be string or None in {name}"
+        assert isinstance(child["href"], (str, type(None))), f"Child href should be string or None in {name}"
+        assert isinstance(child["level"], (int, type(None))), f"Child level should be integer or None in {name}"
+        if isinstance(child["level"], int):
+            assert child["level"] >= 0, f"Child level should be non-negative in {name}"
+        if "children" in child:
+            assert isinstance(child["children"], list), f"Child's children should be a list in {name}"
+            stack.extend(child["children"])
+
+def _parsed(results, epub_file):
+    """Return a session fixture's result for a sample, re-raising its error."""
+    result = results[epub_file]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
 def test_epub_file_not_found():
     """Test behavior with non-existent EPUB file."""
     with pytest.raises(ValidationError):
         EPUBTOCParser("nonexistent_book.epub")
 
-@pytest.mark.skipif(
-    not (Path(__file__).parent.parent / "data" / "epub_samples").exists(),
-    reason="Test EPUB files not available"
-)
-def test_sample_epub_extraction(epub_samples_dir, test_output_dir):
+@requires_samples
+@pytest.mark.parametrize("epub_file", SAMPLE_EPUBS, ids=lambda f: f.name)
+def test_sample_epub_extraction(epub_file, parsed_epubs):
     """Test TOC extraction from sample EPUB files."""
-    epub_files = [f for f in epub_samples_dir.glob("*.epub") if f.is_file()]
-    if not epub_files:
-        pytest.skip("No EPUB files found in test directory")
+    toc = _parsed(parsed_epubs, epub_file).toc
     
-    failed_files = []
-    for epub_file in epub_files:
-        try:
-            parser = EPUBTOCParser(epub_file)
-            toc = parser.extract_toc()
-            
-            # Basic validation of extracted TOC
-            assert isinstance(toc, list), f"TOC from {epub_file.name} should be a list"
-            assert len(toc) > 0, f"TOC from {epub_file.name} should not be empty"
-            
-            # Validate TOC structure
-            for item in toc:
-                assert isinstance(item, dict), f"TOC item from {epub_file.name} should be a dictionary"
-                assert "title" in item, f"TOC item from {epub_file.name} should have title"
-                assert "href" in item, f"TOC item from {epub_file.name} should have href"
-                assert "level" in item, f"TOC item from {epub_file.name} should have level"
-                
-                # Additional validations
-                assert item["title"].strip(), f"Empty title in TOC item from {epub_file.name}"
-                assert item["href"].strip(), f"Empty href in TOC item from {epub_file.name}"
-                assert isinstance(item["level"], int), f"Level in {epub_file.name} should be integer"
-                assert item["level"] >= 0, f"Level in {epub_file.name} should be non-negative"
-                
-                # Children field is optional but must be a list if present
-                if "children" in item:
-                    assert isinstance(item["children"], list), f"children in {epub_file.name} should be a list"
-                
-        except Exception as e:
-            failed_files.append((epub_file.name, str(e)))
+    # Basic validation of extracted TOC
+    assert isinstance(toc, list), f"TOC from {epub_file.name} should be a list"
+    assert len(toc) > 0, f"TOC from {epub_file.name} should not be empty"
     
-    if failed_files:
-        print("\nFailed files in test_sample_epub_extraction:")
-        for name, error in failed_files:
-            print(f"- {name}:")
-            print(f"  {error}")
-        pytest.fail(f"Test failed for {len(failed_files)} files")
+    # Validate TOC structure
+    for item in toc:
+        assert isinstance(item, dict), f"TOC item from {epub_file.name} should be a dictionary"
+        # Raises KeyError if a required field is missing
+        title, href, level = _toc_fields(item)
+        
+        # Additional validations
+        assert title.strip(), f"Empty title in TOC item from {epub_file.name}"
+        assert href.strip(), f"Empty href in TOC item from {epub_file.name}"
+        assert isinstance(level, int), f"Level in {epub_file.name} should be integer"
+        assert level >= 0, f"Level in {epub_file.name} should be non-negative"
+        
+        # Children field is optional but must be a list if present
+        if "children" in item:
+            assert isinstance(item["children"], list), f"children in {epub_file.name} should be a list"
 
-@pytest.mark.skipif(
-    not (Path(__file__).parent.parent / "data" / "epub_samples").exists(),
-    reason="Test EPUB files not available"
-)
-def test_json_export(epub_samples_dir, test_output_dir):
+@requires_samples
+@pytest.mark.parametrize("epub_file", SAMPLE_EPUBS, ids=lambda f: f.name)
+def test_json_export(epub_file, parsed_epubs, sample_metadata, tmp_path):
     """Test JSON export functionality with real EPUB files."""
-    epub_files = [f for f in epub_samples_dir.glob("*.epub") if f.is_file()]
-    if not epub_files:
-        pytest.skip("No EPUB files found in test directory")
+    # TOC and metadata were already extracted by the session fixtures
+    parser = _parsed(parsed_epubs, epub_file)
+    name = epub_file.name
     
-    failed_files = []
-    for epub_file in epub_files:
-        try:
-            parser = EPUBTOCParser(epub_file)
-            
-            # Extract TOC first
-            parser.extract_toc()
-            
-            # Save to JSON
-            output_file = test_output_dir / f"{epub_file.stem}_toc.json"
-            parser.save_toc_to_json(output_file)
-            
-            # Verify file exists and not empty
-            assert output_file.exists(), f"JSON file for {epub_file.name} should be created"
-            assert output_file.stat().st_size > 0, f"JSON file for {epub_file.name} should not be empty"
-            
-            # Validate JSON structure
-            with open(output_file) as f:
-                data = json.load(f)
-            
-            # Validate root structure
-            assert isinstance(data, dict), f"Root should be a dictionary for {epub_file.name}"
-            assert "metadata" in data, f"Missing metadata key in {epub_file.name}"
-            assert "toc" in data, f"Missing toc key in {epub_file.name}"
-            
-            # Validate metadata
-            assert isinstance(data["metadata"], dict), f"Metadata should be a dictionary in {epub_file.name}"
-            
-            # Required metadata fields
-            required_metadata = ["title", "authors", "file_name"]  # Made file_size optional
-            for field in required_metadata:
-                assert field in data["metadata"], f"Missing required metadata field '{field}' in {epub_file.name}"
-            
-            # Type checks for metadata
-            assert isinstance(data["metadata"]["title"], (str, type(None))), f"Title should be string or None in {epub_file.name}"
-            assert isinstance(data["metadata"]["authors"], (list, type(None))), f"Authors should be list or None in {epub_file.name}"
-            assert isinstance(data["metadata"]["file_name"], (str, type(None))), f"File name should be string or None in {epub_file.name}"
-            if "file_size" in data["metadata"]:
-                assert isinstance(data["metadata"]["file_size"], (int, type(None))), f"File size should be integer or None in {epub_file.name}"
-            
-            # Optional metadata fields should have correct types if present
-            if "publisher" in data["metadata"]:
-                assert isinstance(data["metadata"]["publisher"], (str, type(None))), f"Publisher should be string or None in {epub_file.name}"
-            if "publication_date" in data["metadata"]:
-                assert isinstance(data["metadata"]["publication_date"], (str, type(None))), f"Publication date should be string or None in {epub_file.name}"
-            if "language" in data["metadata"]:
-                assert isinstance(data["metadata"]["language"], (str, type(None))), f"Language should be string or None in {epub_file.name}"
-            if "description" in data["metadata"]:
-                assert isinstance(data["metadata"]["description"], (str, type(None))), f"Description should be string or None in {epub_file.name}"
-            
-            # Validate TOC
-            assert isinstance(data["toc"], list), f"TOC should be a list in {epub_file.name}"
-            for item in data["toc"]:
-                assert isinstance(item, dict), f"TOC item should be a dictionary in {epub_file.name}"
-                assert "title" in item, f"TOC item missing title in {epub_file.name}"
-                assert "href" in item, f"TOC item missing href in {epub_file.name}"
-                assert "level" in item, f"TOC item missing level in {epub_file.name}"
-                
-                # Validate field types
-                assert isinstance(item["title"], (str, type(None))), f"Title should be string or None in {epub_file.name}"
-                assert isinstance(item["href"], (str, type(None))), f"Href should be string or None in {epub_file.name}"
-                assert isinstance(item["level"], (int, type(None))), f"Level should be integer or None in {epub_file.name}"
-                if isinstance(item["level"], int):
-                    assert item["level"] >= 0, f"Level should be non-negative in {epub_file.name}"
-                
-                # Children field is optional but must be a list if present
-                if "children" in item:
-                    assert isinstance(item["children"], list), f"Children should be a list in {epub_file.name}"
-                    # Recursively validate children
-                    def validate_children(children):
-                        for child in children:
-                            assert isinstance(child, dict), f"Child TOC item should be a dictionary in {epub_file.name}"
-                            assert "title" in child, f"Child TOC item missing title in {epub_file.name}"
-                            assert "href" in child, f"Child TOC item missing href in {epub_file.name}"
-                            assert "level" in child, f"Child TOC item missing level in {epub_file.name}"
-                            assert isinstance(child["title"], (str, type(None))), f"Child title should be string or None in {epub_file.name}"
-                            assert isinstance(child["href"], (str, type(None))), f"Child href should be string or None in {epub_file.name}"
-                            assert isinstance(child["level"], (int, type(None))), f"Child level should be integer or None in {epub_file.name}"
-                            if isinstance(child["level"], int):
-                                assert child["level"] >= 0, f"Child level should be non-negative in {epub_file.name}"
-                            if "children" in child:
-                                assert isinstance(child["children"], list), f"Child's children should be a list in {epub_file.name}"
-                                validate_children(child["children"])
-                    
-                    validate_children(item["children"])
-            
-        except Exception as e:
-            failed_files.append((epub_file.name, str(e)))
+    # Save to JSON
+    output_file = tmp_path / f"{epub_file.stem}_toc.json"
+    parser.save_toc_to_json(output_file, metadata=_parsed(sample_metadata, epub_file))
+    if os.getenv("KEEP_TOC_JSON"):
+        KEPT_JSON_DIR.mkdir(exist_ok=True)
+        shutil.copy(output_file, KEPT_JSON_DIR / output_file.name)
     
-    if failed_files:
-        print("\nFailed files in test_json_export:")
-        for name, error in failed_files:
-            print(f"- {name}:")
-            print(f"  {error}")
-        pytest.fail(f"Test failed for {len(failed_files)} files")
-
-def test_metadata_extraction(epub_samples_dir):
-    """Test metadata extraction from EPUB files."""
-    epub_files = [f for f in epub_samples_dir.glob("*.epub") if f.is_file()]
-    if not epub_files:
-        pytest.skip("No EPUB files found in test directory")
+    # Verify file exists and not empty
+    assert output_file.exists(), f"JSON file for {name} should be created"
+    assert output_file.stat().st_size > 0, f"JSON file for {name} should not be empty"
+    
+    # Validate JSON structure
+    data = orjson.loads(output_file.read_bytes()) if orjson is not None else json.loads(output_file.read_bytes())
+    
+    # Validate root structure
+    assert isinstance(data, dict), f"Root should be a dictionary for {name}"
+    assert "metadata" in data, f"Missing metadata key in {name}"
+    assert "toc" in data, f"Missing toc key in {name}"
+    
+    # Validate metadata
+    metadata = data["metadata"]
+    assert isinstance(metadata, dict), f"Metadata should be a dictionary in {name}"
+    
+    # Required metadata fields
+    for field in REQUIRED_METADATA:
+        assert field in metadata, f"Missing required metadata field '{field}' in {name}"
+    
+    # Type checks for metadata
+    assert isinstance(metadata["title"], (str, type(None))), f"Title should be string or None in {name}"
+    assert isinstance(metadata["authors"], (list, type(None))), f"Authors should be list or None in {name}"
+    assert isinstance(metadata["file_name"], (str, type(None))), f"File name should be string or None in {name}"
+    if "file_size" in metadata:
+        assert isinstance(metadata["file_size"], (int, type(None))), f"File size should be integer or None in {name}"
+    
+    # Optional metadata fields should have correct types if present
+    if "publisher" in metadata:
+        assert isinstance(metadata["publisher"], (str, type(None))), f"Publisher should be string or None in {name}"
+    if "publication_date" in metadata:
+        assert isinstance(metadata["publication_date"], (str, type(None))), f"Publication date should be string or None in {name}"
+    if "language" in metadata:
+        assert isinstance(metadata["language"], (str, type(None))), f"Language should be string or None in {name}"
+    if "description" in metadata:
+        assert isinstance(metadata["description"], (str, type(None))), f"Description should be string or None in {name}"
     
-    for epub_file in epub_files:
-        parser = EPUBTOCParser(epub_file)
-        metadata = parser.extract_metadata()
+    # Validate TOC
+    toc = data["toc"]
+    assert isinstance(toc, list), f"TOC should be a list in {name}"
+    for item in toc:
+        assert isinstance(item, dict), f"TOC item should be a dictionary in {name}"
+        assert "title" in item, f"TOC item missing title in {name}"
+        assert "href" in item, f"TOC item missing href in {name}"
+        assert "level" in item, f"TOC item missing level in {name}"
         
-        # Basic validation of metadata
-        assert isinstance(metadata, dict), f"Metadata from {epub_file.name} should be a dictionary"
+        # Validate field types
+        assert isinstance(item["title"], (str, type(None))), f"Title should be string or None in {name}"
+        assert isinstance(item["href"], (str, type(None))), f"Href should be string or None in {name}"
+        assert isinstance(item["level"], (int, type(None))), f"Level should be integer or None in {name}"
+        if isinstance(item["level"], int):
+            assert item["level"] >= 0, f"Level should be non-negative in {name}"
         
-        # Check required fields are of correct type if present
-        if "title" in metadata:
-            assert isinstance(metadata["title"], str)
-        if "authors" in metadata:
-            assert isinstance(metadata["authors"], list)
-        if "file_size" in metadata:
-            assert isinstance(metadata["file_size"], (int, type(None)))
-        if "file_name" in metadata:
-            assert isinstance(metadata["file_name"], str)
-            assert metadata["file_name"] == epub_file.name 
\ No newline at end of file
+        # Children field is optional but must be a list if present
+        if "children" in item:
+            assert isinstance(item["children"], list), f"Children should be a list in {name}"
+            _validate_subtree(item["children"], name)
+
+@requires_samples
+@pytest.mark.parametrize("epub_file", SAMPLE_EPUBS, ids=lambda f: f.name)
+def test_metadata_extraction(epub_file, sample_metadata):
+    """Test metadata extraction from EPUB files."""
+    metadata = _parsed(sample_metadata, epub_file)
+    
+    # Basic validation of metadata
+    assert isinstance(metadata, dict), f"Metadata from {epub_file.name} should be a dictionary"
+    
+    # Check required fields are of correct type if present
+    if "title" in metadata:
+        assert isinstance(metadata["title"], str)
+    if "authors" in metadata:
+        assert isinstance(metadata["authors"], list)
+    if "file_size" in metadata:
+        assert isinstance(metadata["file_size"], (int, type(None)))
+    if "file_name" in metadata:
+        assert isinstance(metadata["file_name"], str)
+        assert metadata["file_name"] == epub_file.name 
\ No newline at end of file
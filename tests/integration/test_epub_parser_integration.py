@@ -1,7 +1,7 @@
 """Integration tests for EPUB TOC Parser."""
 
+import re
 import pytest
-from pathlib import Path
 from typing import List, Dict
 
 from epub_toc import (
@@ -12,23 +12,27 @@ from epub_toc import (
     StructureError,
     ParsingError
 )
+from tests.helpers import list_sample_epubs
 
-def validate_toc_structure(toc_items: List[Dict]) -> List[str]:
-    """Validate TOC structure with simplified checks."""
-    errors = []
+# One test case per sample for the per-file checks, so pytest-xdist
+# (pytest -n auto) can spread them across worker processes
+SAMPLE_EPUBS = list_sample_epubs()
+per_sample = pytest.mark.parametrize("epub_file", SAMPLE_EPUBS, ids=lambda f: f.name)
+
+# Methods that read the book's own TOC labels; the OPF method only sees
+# the spine and titles entries "Chapter N"
+TITLED_METHODS = ('epub_meta', 'ncx')
+OPF_PLACEHOLDER_TITLE = re.compile(r"Chapter \d+")
+
+# Content document suffixes accepted for TOC hrefs without an anchor
+HTML_EXTENSIONS = ('.html', '.xhtml', '.htm')
+
+def validate_toc_structure(toc_items: List[Dict], fail_fast: bool = False) -> List[str]:
+    """Validate TOC structure with simplified checks.
     
-    def validate_item(item: Dict, path: str = "root"):
-        # Only check if required fields exist
-        required_fields = ['title', 'href']
-        
-        for field in required_fields:
-            if field not in item:
-                errors.append(f"{path}: Missing required field '{field}'")
-        
-        # Check children if they exist
-        if 'children' in item and isinstance(item['children'], list):
-            for i, child in enumerate(item['children']):
-                validate_item(child, f"{path}->child[{i}]")
+    With fail_fast, stop at the first item that has errors.
+    """
+    errors = []
     
     # Handle both old and new format
     if isinstance(toc_items, dict) and 'toc' in toc_items:
@@ -39,22 +43,44 @@ def validate_toc_structure(toc_items: List[Dict]) -> List[str]:
     if not isinstance(items_to_validate, list):
         errors.append("TOC must be a list")
         return errors
+    
+    # Walk the tree with an explicit stack, in document order
+    stack = [(item, f"item[{i}]") for i, item in reversed(list(enumerate(items_to_validate)))]
+    while stack:
+        item, path = stack.pop()
+        
+        # Only check if required fields exist
+        if 'title' not in item:
+            errors.append(f"{path}: Missing required field 'title'")
+        if 'href' not in item:
+            errors.append(f"{path}: Missing required field 'href'")
         
-    for i, item in enumerate(items_to_validate):
-        validate_item(item, f"item[{i}]")
+        if fail_fast and errors:
+            break
+        
+        # Check children if they exist
+        children = item.get('children')
+        if isinstance(children, list):
+            stack.extend(
+                (child, f"{path}->child[{i}]")
+                for i, child in reversed(list(enumerate(children)))
+            )
     
     return errors
 
-@pytest.fixture
-def sample_epub_files(epub_samples_dir):
-    """Get list of sample EPUB files."""
-    files = [
-        f for f in epub_samples_dir.glob("*.epub")
-        if f.is_file()  # Only include actual files, not directories
-    ]
-    if not files:
-        pytest.skip("No EPUB files found in test directory")
-    return files
+def _walk(items):
+    """Yield (item, parent) for every TOC item in document order.
+    
+    Top-level items have parent None. Walks with an explicit stack, so
+    deeply nested TOCs cannot hit the recursion limit.
+    """
+    stack = [(item, None) for item in reversed(items)]
+    while stack:
+        item, parent = stack.pop()
+        yield item, parent
+        children = item.get('children')
+        if isinstance(children, list):
+            stack.extend((child, item) for child in reversed(children))
 
 def test_parser_initialization(sample_epub_files):
     """Test parser initialization with different configurations."""
@@ -85,14 +111,18 @@ def test_toc_item_validation():
     assert item.title == "Title"
     assert item.href == "href.html"
     assert item.level == 0
-    
-    # Test missing title
-    with pytest.raises(ValidationError):
-        TOCItem("", "href.html", 0)
-    
-    # Test missing href
+
+@pytest.mark.parametrize("title,href", [
+    ("", "href.html"),       # missing title
+    (None, "href.html"),
+    ("   ", "href.html"),    # blank title
+    ("Title", ""),           # missing href
+    ("Title", None),
+])
+def test_toc_item_validation_rejects(title, href):
+    """Test that TOC items without a title or href are rejected."""
     with pytest.raises(ValidationError):
-        TOCItem("Title", "", 0)
+        TOCItem(title, href, 0)
 
 def test_extraction_methods(sample_epub_files):
     """Test individual extraction methods."""
@@ -126,31 +156,31 @@ def test_extraction_methods(sample_epub_files):
                     'error': str(e)
                 })
     
-    # Report results
-    print("\nExtraction Method Results:")
+    # Report results, printed in one go
+    n_files = len(sample_epub_files)
+    lines = ["\nExtraction Method Results:"]
     for method, successful_files in results.items():
-        success_rate = len(successful_files) / len(sample_epub_files) * 100
-        print(f"\n{method}:")
-        print(f"Success rate: {success_rate:.1f}%")
-        print(f"Successful files: {len(successful_files)}")
+        lines.append(
+            f"\n{method}:\n"
+            f"Success rate: {len(successful_files) / n_files * 100:.1f}%\n"
+            f"Successful files: {len(successful_files)}"
+        )
     
-    print("\nExtraction Method Errors:")
+    lines.append("\nExtraction Method Errors:")
     for method, method_errors in errors.items():
-        print(f"\n{method}:")
+        lines.append(f"\n{method}:")
         for error in method_errors:
             if 'errors' in error:
-                print(f"- {error['file']}: Structure validation failed")
-                for err in error['errors']:
-                    print(f"  - {err}")
+                lines.append(f"- {error['file']}: Structure validation failed")
+                lines.extend(f"  - {err}" for err in error['errors'])
             else:
-                print(f"- {error['file']}: {error['error']}")
+                lines.append(f"- {error['file']}: {error['error']}")
+    print("\n".join(lines))
     
     # Ensure at least one method works for each file
+    succeeded = set().union(*results.values())
     for epub_file in sample_epub_files:
-        assert any(
-            epub_file.name in successful_files
-            for successful_files in results.values()
-        ), f"No extraction method succeeded for {epub_file.name}"
+        assert epub_file.name in succeeded, f"No extraction method succeeded for {epub_file.name}"
 
 def test_fallback_behavior(sample_epub_files):
     """Test parser fallback behavior."""
@@ -249,7 +279,7 @@ def test_toc_validation():
             "children": []
         }]
     }
-    errors = validate_toc_structure(invalid_data)
+    errors = validate_toc_structure(invalid_data, fail_fast=True)
     assert len(errors) > 0, "Missing required field should fail validation"
     
     # Test invalid root structure
@@ -259,7 +289,7 @@ def test_toc_validation():
         }
         # missing toc
     }
-    errors = validate_toc_structure(invalid_data)
+    errors = validate_toc_structure(invalid_data, fail_fast=True)
     assert len(errors) > 0, "Invalid root structure should fail validation"
 
 def test_toc_hierarchy():
@@ -284,127 +314,116 @@ def test_toc_hierarchy():
         # missing href
         'children': []
     }]
-    errors = validate_toc_structure(invalid_toc)
+    errors = validate_toc_structure(invalid_toc, fail_fast=True)
     assert len(errors) > 0, "Expected validation errors for missing required field"
 
-def test_toc_hierarchy_logic(sample_epub_files):
+@per_sample
+def test_toc_hierarchy_logic(sample_toc):
     """Test logical aspects of TOC hierarchy with relaxed validation."""
-    for epub_file in sample_epub_files:
-        parser = EPUBTOCParser(epub_file)
-        toc = parser.extract_toc()
+    for item, parent in _walk(sample_toc):
+        # Title should be different from parent
+        parent_title = parent['title'] if parent is not None else ""
+        assert item['title'] != parent_title, \
+               f"Child title same as parent: {item['title']}"
         
-        def check_hierarchy_logic(items, parent_title=""):
-            for item in items:
-                # Title should be different from parent
-                assert item['title'] != parent_title, \
-                       f"Child title same as parent: {item['title']}"
-                
-                # Check children
-                if 'children' in item and item['children']:
-                    # Relaxed title length check
-                    for child in item['children']:
-                        assert len(child['title']) >= 1, \
-                               f"Child title too short: {child['title']}"
-                    
-                    check_hierarchy_logic(item['children'], item['title'])
-        
-        check_hierarchy_logic(toc)
+        # Relaxed title length check
+        if parent is not None:
+            assert len(item['title']) >= 1, \
+                   f"Child title too short: {item['title']}"
 
-def test_functional_toc_extraction(sample_epub_files):
+@per_sample
+def test_functional_toc_extraction(sample_toc):
     """Test functional aspects of TOC extraction."""
-    for epub_file in sample_epub_files:
-        parser = EPUBTOCParser(epub_file)
-        toc = parser.extract_toc()
+    toc = sample_toc
+    
+    # Basic functional checks
+    assert isinstance(toc, list), "TOC should be a list"
+    
+    # Check every item, nested ones included
+    for item, _ in _walk(toc):
+        # Check content validity
+        assert 'title' in item, "Item should have a title"
+        assert item['title'], "Title should not be empty"
         
-        # Basic functional checks
-        assert isinstance(toc, list), "TOC should be a list"
+        assert 'href' in item, "Item should have an href"
+        assert item['href'], "Href should not be empty"
         
-        def check_toc_item(item):
-            # Check content validity
-            assert 'title' in item, "Item should have a title"
-            assert item['title'], "Title should not be empty"
-            
-            assert 'href' in item, "Item should have an href"
-            assert item['href'], "Href should not be empty"
-            
-            # Check if href points to a valid file or anchor
-            assert item['href'].endswith(('.html', '.xhtml', '.htm')) or '#' in item['href'], \
-                   f"Invalid href format: {item['href']}"
-            
-            # Check children recursively
-            if 'children' in item:
-                assert isinstance(item['children'], list), "Children should be a list"
-                for child in item['children']:
-                    check_toc_item(child)
+        # Check if href points to a valid file or anchor
+        assert item['href'].endswith(HTML_EXTENSIONS) or '#' in item['href'], \
+               f"Invalid href format: {item['href']}"
         
-        # Check each top-level item
-        for item in toc:
-            check_toc_item(item)
+        if 'children' in item:
+            assert isinstance(item['children'], list), "Children should be a list"
 
-def test_toc_content_consistency(sample_epub_files):
+@per_sample
+def test_toc_content_consistency(sample_toc):
     """Test that extracted TOC content is consistent with EPUB content."""
-    for epub_file in sample_epub_files:
-        parser = EPUBTOCParser(epub_file)
-        toc = parser.extract_toc()
+    seen = set()
+    for item, _ in _walk(sample_toc):
+        href = item['href']
         
-        # Get all hrefs from TOC
-        def collect_hrefs(item):
-            hrefs = [item['href']]
-            if 'children' in item:
-                for child in item['children']:
-                    hrefs.extend(collect_hrefs(child))
-            return hrefs
-            
-        all_hrefs = []
-        for item in toc:
-            all_hrefs.extend(collect_hrefs(item))
-            
         # Check that hrefs are unique
-        unique_hrefs = set(all_hrefs)
-        assert len(all_hrefs) == len(unique_hrefs), "TOC contains duplicate hrefs"
+        assert href not in seen, f"TOC contains duplicate hrefs: {href}"
+        seen.add(href)
         
         # Check that hrefs follow a logical pattern
-        for href in unique_hrefs:
-            if '#' in href:
-                base_href, anchor = href.split('#', 1)
-                assert anchor, f"Empty anchor in href: {href}"
-            else:
-                assert any(href.endswith(ext) for ext in ['.html', '.xhtml', '.htm']), \
-                       f"Invalid href extension: {href}"
+        if '#' in href:
+            base_href, anchor = href.split('#', 1)
+            assert anchor, f"Empty anchor in href: {href}"
+        else:
+            assert href.endswith(HTML_EXTENSIONS), \
+                   f"Invalid href extension: {href}"
 
-def test_toc_extraction_methods_comparison(sample_epub_files):
+@per_sample
+def test_toc_extraction_methods_comparison(epub_file):
     """Compare results from different extraction methods."""
-    for epub_file in sample_epub_files:
-        results = {}
+    results = {}
+    
+    # Try each method individually
+    for method_name in ['epub_meta', 'ncx', 'opf']:
+        parser = EPUBTOCParser(epub_file, extraction_methods=[method_name])
+        try:
+            toc = parser.extract_toc()
+            if toc:
+                results[method_name] = toc
+        except Exception:
+            continue
+    
+    # Nothing to compare if less than 2 methods succeeded
+    if len(results) < 2:
+        return
         
-        # Try each method individually
-        for method_name in ['epub_meta', 'ncx', 'opf']:
-            parser = EPUBTOCParser(epub_file, extraction_methods=[method_name])
-            try:
-                toc = parser.extract_toc()
-                if toc:
-                    results[method_name] = toc
-            except Exception:
+    # Compare number of entries
+    entry_counts = {method: len(toc) for method, toc in results.items()}
+    max_diff = max(entry_counts.values()) - min(entry_counts.values())
+    assert max_diff <= 2, f"Too much variance in TOC size between methods: {entry_counts}"
+    
+    # Compare titles (they should be similar between methods that read
+    # the book's own TOC; see test_opf_titles_are_spine_placeholders)
+    titles_by_method = {
+        method: frozenset(item['title'] for item in toc)
+        for method, toc in results.items() if method in TITLED_METHODS
+    }
+    for method1, titles1 in titles_by_method.items():
+        for method2, titles2 in titles_by_method.items():
+            if method1 >= method2:
                 continue
-        
-        # Skip if less than 2 methods succeeded
-        if len(results) < 2:
-            continue
             
-        # Compare number of entries
-        entry_counts = {method: len(toc) for method, toc in results.items()}
-        max_diff = max(entry_counts.values()) - min(entry_counts.values())
-        assert max_diff <= 2, f"Too much variance in TOC size between methods: {entry_counts}"
-        
-        # Compare titles (they should be similar between methods)
-        for method1, toc1 in results.items():
-            for method2, toc2 in results.items():
-                if method1 >= method2:
-                    continue
-                    
-                titles1 = set(item['title'] for item in toc1)
-                titles2 = set(item['title'] for item in toc2)
-                
-                common_titles = titles1.intersection(titles2)
-                assert len(common_titles) >= min(len(titles1), len(titles2)) * 0.5, \
-                       f"Too few common titles between {method1} and {method2}" 
\ No newline at end of file
+            common_titles = titles1 & titles2
+            assert len(common_titles) >= min(len(titles1), len(titles2)) * 0.5, \
+                   f"Too few common titles between {method1} and {method2}"
+
+@per_sample
+def test_opf_titles_are_spine_placeholders(epub_file):
+    """Test that the OPF method numbers spine documents instead of naming them."""
+    parser = EPUBTOCParser(epub_file, extraction_methods=['opf'])
+    try:
+        toc = parser.extract_toc()
+    except ExtractionError:
+        pytest.skip(f"No OPF spine in {epub_file.name}")
+    
+    assert parser.extraction_method == 'opf'
+    for item in toc:
+        assert OPF_PLACEHOLDER_TITLE.fullmatch(item['title']), item['title']
+        assert item['level'] == 0
+        assert item['children'] == []
@@ -1,136 +1,164 @@
-"""Tests for package installation and uninstallation."""
+"""Tests for package installation and uninstallation.
 
+The tests work in throwaway virtual environments and never touch the
+interpreter running the suite, so they can run in parallel under
+pytest-xdist. epub_toc is installed from PyPI once per session into a
+venv that tests only read; the uninstallation and development install
+tests change their environment, so each gets a venv of its own.
+"""
+
+import glob
 import subprocess
 import sys
-import importlib
 import pytest
-import time
 import shutil
-import site
 import os
-import glob
-import tempfile
+import time
+from pathlib import Path
+
+# Runtime dependencies, by import name
+REQUIRED_MODULES = (
+    "epub_meta",
+    "bs4",  # beautifulsoup4 импортируется как bs4
+    "lxml",
+    "ebooklib",
+    "tika",
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _venv_python(venv_dir):
+    """Return the python executable of a virtual environment."""
+    if sys.platform == "win32":
+        return os.path.join(venv_dir, "Scripts", "python.exe")
+    return os.path.join(venv_dir, "bin", "python")
 
 
-def run_command(command):
-    """Run shell command and return output."""
-    process = subprocess.run(
-        command,
-        shell=True,
-        check=True,
-        capture_output=True,
-        text=True
+def _pip(python, *args, **kwargs):
+    """Run pip non-interactively under the given interpreter.
+    
+    Installs skip pip's wheel cache when EPUB_TOC_CI is set; local runs
+    keep it. Keyword arguments are passed to subprocess.run, which checks
+    the exit status unless told otherwise.
+    """
+    command = [python, "-m", "pip", "--disable-pip-version-check", "--no-input", *args]
+    if args[0] == "install" and os.environ.get("EPUB_TOC_CI") == "1":
+        command.append("--no-cache-dir")
+    kwargs.setdefault("check", True)
+    return subprocess.run(command, **kwargs)
+
+
+def _is_installed(python, name):
+    """Return whether pip has the distribution installed."""
+    return _pip(
+        python, "show", name,
+        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ).returncode == 0
+
+
+def _check_import(python):
+    """Check that the venv's interpreter can import epub_toc and its dependencies."""
+    # find_spec only looks the module up, it does not execute it
+    check = (
+        "import importlib.util, epub_toc\n"
+        "assert hasattr(epub_toc, 'EPUBTOCParser')\n"
+        "assert hasattr(epub_toc, '__version__')\n"
+        f"for module in {REQUIRED_MODULES!r}:\n"
+        "    assert importlib.util.find_spec(module) is not None, f'{module} is not installed'\n"
     )
-    return process.stdout
+    subprocess.run([python, "-c", check], check=True)
 
 
-def clean_package_from_system():
-    """Clean package from system completely."""
-    # Uninstall package
-    try:
-        run_command("pip uninstall -y epub_toc")
-    except subprocess.CalledProcessError:
-        pass
-
-    # Remove from sys.modules
-    for module in list(sys.modules.keys()):
-        if module.startswith("epub_toc"):
-            del sys.modules[module]
-
-    # Remove from site-packages
-    for site_dir in site.getsitepackages() + [site.getusersitepackages()]:
-        for item in ["epub_toc.egg-link", "epub_toc", "epub_toc-*.dist-info"]:
-            pattern = os.path.join(site_dir, item)
-            try:
-                for path in glob.glob(pattern):
-                    if os.path.isdir(path):
-                        shutil.rmtree(path)
-                    else:
-                        os.remove(path)
-            except Exception:
-                pass
-
-    # Wait for filesystem operations to complete
-    time.sleep(2)
-
-
-def test_package_installation():
+def _create_venv(venv_dir):
+    """Create a virtual environment and return its python executable."""
+    subprocess.run([sys.executable, "-m", "venv", venv_dir], check=True, stdout=subprocess.DEVNULL)
+    return _venv_python(venv_dir)
+
+
+def _wait_absent(patterns, timeout=2.0, interval=0.02):
+    """Wait until no path matches any of the glob patterns.
+    
+    Returns:
+        True as soon as the paths are gone, False after the timeout
+    """
+    deadline = time.monotonic() + timeout
+    while any(glob.glob(pattern) for pattern in patterns):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+@pytest.fixture(scope="session")
+def shared_venv(tmp_path_factory):
+    """Create one virtual environment with epub_toc installed from PyPI.
+    
+    Tests must not install into or remove from it.
+    
+    Yields:
+        Tuple of the venv's python executable and pip's install output
+    """
+    venv_dir = str(tmp_path_factory.mktemp("install") / "venv")
+    python = _create_venv(venv_dir)
+    output = _pip(python, "install", "epub_toc", capture_output=True, text=True).stdout
+    yield python, output
+    shutil.rmtree(venv_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def venv(tmp_path):
+    """Create an empty virtual environment for one test.
+    
+    Yields:
+        Path of the venv's directory
+    """
+    venv_dir = str(tmp_path / "venv")
+    _create_venv(venv_dir)
+    yield venv_dir
+    shutil.rmtree(venv_dir, ignore_errors=True)
+
+
+def test_package_installation(shared_venv):
     """Test that package can be installed via pip."""
-    clean_package_from_system()
+    venv_python, output = shared_venv
+    assert "Successfully installed" in output
+    assert _is_installed(venv_python, "epub_toc")
+    _check_import(venv_python)
+
+
+def test_package_uninstallation(venv):
+    """Test that package can be uninstalled via pip."""
+    venv_python = _venv_python(venv)
     
     # Install package
-    output = run_command("pip install epub_toc")
-    assert "Successfully installed epub_toc" in output
-    
-    # Check that package can be imported
-    epub_toc = importlib.import_module("epub_toc")
-    assert hasattr(epub_toc, "EPUBTOCParser")
+    _pip(venv_python, "install", "epub_toc", stdout=subprocess.DEVNULL)
     
-    # Check version
-    assert hasattr(epub_toc, "__version__")
+    # Verify it's installed
+    assert _is_installed(venv_python, "epub_toc")
     
-    # Check that all required modules are installed
-    required_modules = [
-        "epub_meta",
-        "bs4",  # beautifulsoup4 импортируется как bs4
-        "lxml",
-        "ebooklib",
-        "tika"
-    ]
+    # Uninstall package
+    _pip(venv_python, "uninstall", "-y", "epub_toc", stdout=subprocess.DEVNULL)
     
-    for module in required_modules:
-        importlib.import_module(module)
+    # Verify pip does not know about it anymore and its files are gone
+    assert not _is_installed(venv_python, "epub_toc")
+    assert _wait_absent([
+        os.path.join(venv, lib, "site-packages", item)
+        for lib in (os.path.join("lib", "python*"), "Lib")
+        for item in ("epub_toc", "epub_toc-*.dist-info")
+    ])
 
 
-@pytest.mark.trylast
-def test_package_uninstallation():
-    """Test that package can be uninstalled via pip."""
-    # Create a temporary virtual environment for isolation
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        venv_dir = os.path.join(tmp_dir, "venv")
-        run_command(f"python -m venv {venv_dir}")
-        
-        # Get path to python and pip in new venv
-        if sys.platform == "win32":
-            venv_python = os.path.join(venv_dir, "Scripts", "python.exe")
-            venv_pip = os.path.join(venv_dir, "Scripts", "pip.exe")
-        else:
-            venv_python = os.path.join(venv_dir, "bin", "python")
-            venv_pip = os.path.join(venv_dir, "bin", "pip")
-        
-        # Install package
-        subprocess.run([venv_pip, "install", "epub_toc"], check=True)
-        
-        # Verify it's installed
-        pip_list = subprocess.run(
-            [venv_pip, "list"], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        ).stdout
-        assert "epub_toc" in pip_list
-        
-        # Uninstall package
-        subprocess.run([venv_pip, "uninstall", "-y", "epub_toc"], check=True)
-        
-        # Verify it's not in pip list anymore
-        pip_list_after = subprocess.run(
-            [venv_pip, "list"], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        ).stdout
-        assert "epub_toc" not in pip_list_after
-
-
-def test_development_installation():
+def test_development_installation(venv):
     """Test that package can be installed in development mode."""
-    clean_package_from_system()
+    venv_python = _venv_python(venv)
     
-    # Install in development mode
-    output = run_command("pip install -e .")
+    output = _pip(
+        venv_python, "install", "-e", str(PROJECT_ROOT), capture_output=True, text=True
+    ).stdout
     assert "Successfully installed" in output
     
-    # Check that package can be imported
-    epub_toc = importlib.import_module("epub_toc")
-    assert hasattr(epub_toc, "EPUBTOCParser") 
\ No newline at end of file
+    # epub_toc itself must now point at the working tree
+    show = _pip(venv_python, "show", "epub_toc", capture_output=True, text=True).stdout
+    assert f"Editable project location: {PROJECT_ROOT}" in show
+    _check_import(venv_python)
@@ -1,20 +1,21 @@
 """Unit tests for EPUB TOC Parser."""
 
 import pytest
-from pathlib import Path
 from epub_toc import (
     EPUBTOCParser,
     TOCItem,
     ValidationError,
     ExtractionError
 )
+import io
 import json
 import zipfile
 import os
+import time
 
-def create_minimal_epub(path):
-    """Create a minimal valid EPUB file for testing."""
-    with zipfile.ZipFile(path, 'w') as epub:
+def _write_minimal_epub(file):
+    """Write the minimal EPUB archive to a path or file object."""
+    with zipfile.ZipFile(file, 'w') as epub:
         # Add mimetype file
         epub.writestr('mimetype', 'application/epub+zip')
         
@@ -45,6 +46,20 @@ def create_minimal_epub(path):
 </package>'''
         epub.writestr('content.opf', content_opf)
 
+@pytest.fixture(scope="session")
+def minimal_epub_bytes():
+    """Build the minimal EPUB archive once per session."""
+    buf = io.BytesIO()
+    _write_minimal_epub(buf)
+    return buf.getvalue()
+
+@pytest.fixture
+def minimal_epub(tmp_path, minimal_epub_bytes):
+    """Return the path of a fresh copy of the minimal EPUB."""
+    path = tmp_path / "test.epub"
+    path.write_bytes(minimal_epub_bytes)
+    return path
+
 @pytest.fixture
 def sample_toc_item():
     """Create a sample TOC item for testing."""
@@ -69,6 +84,7 @@ def test_toc_item_creation():
     assert item.level == 0
     assert item.children == []
     assert item.description is None
+    assert not hasattr(item, '__dict__')
 
 def test_toc_item_to_dict(sample_toc_item):
     """Test TOCItem serialization to dictionary."""
@@ -96,20 +112,16 @@ def mock_epub_meta(mocker):
     """Mock epub_meta.get_epub_metadata function."""
     return mocker.patch("epub_toc.parser.get_epub_metadata")
 
-def test_extract_from_epub_meta_empty(mock_epub_meta, tmp_path):
+def test_extract_from_epub_meta_empty(mock_epub_meta, minimal_epub):
     """Test extraction when epub_meta returns no TOC."""
-    epub_path = tmp_path / "test.epub"
-    create_minimal_epub(epub_path)
     mock_epub_meta.return_value = {"toc": []}
     
-    parser = EPUBTOCParser(epub_path)
+    parser = EPUBTOCParser(minimal_epub)
     result = parser._extract_from_epub_meta()
     assert result is None
 
-def test_extract_from_epub_meta_success(mock_epub_meta, tmp_path):
+def test_extract_from_epub_meta_success(mock_epub_meta, minimal_epub):
     """Test successful TOC extraction via epub_meta."""
-    epub_path = tmp_path / "test.epub"
-    create_minimal_epub(epub_path)
     mock_epub_meta.return_value = {
         "toc": [
             {"title": "Chapter 1", "src": "ch1.html", "level": 0},
@@ -117,7 +129,7 @@ def test_extract_from_epub_meta_success(mock_epub_meta, tmp_path):
         ]
     }
     
-    parser = EPUBTOCParser(epub_path)
+    parser = EPUBTOCParser(minimal_epub)
     result = parser._extract_from_epub_meta()
     assert result is not None
     assert len(result) == 1
@@ -126,14 +138,24 @@ def test_extract_from_epub_meta_success(mock_epub_meta, tmp_path):
     assert len(result[0].children) == 1
     assert result[0].children[0].title == "Section 1.1"
 
-def test_save_toc_to_json(tmp_path):
+def test_extract_from_epub_meta_keeps_order_of_large_toc(mock_epub_meta, minimal_epub):
+    """Test that a large epub_meta TOC keeps its original order."""
+    mock_epub_meta.return_value = {
+        "toc": [
+            {"title": f"Chapter {i}", "src": f"ch{i}.html", "level": 0}
+            for i in range(500)
+        ]
+    }
+    
+    parser = EPUBTOCParser(minimal_epub)
+    result = parser._extract_from_epub_meta()
+    assert [item.href for item in result] == [f"ch{i}.html" for i in range(500)]
+
+def test_save_toc_to_json(tmp_path, minimal_epub):
     """Test saving TOC to JSON file with simplified format."""
-    # Create test file
-    test_file = tmp_path / "test.epub"
-    create_minimal_epub(test_file)
     
     # Initialize parser
-    parser = EPUBTOCParser(test_file)
+    parser = EPUBTOCParser(minimal_epub)
     
     # Create sample TOC
     toc = [
@@ -181,10 +203,286 @@ def test_save_toc_to_json(tmp_path):
     assert toc_data[1]["level"] == 1
     assert isinstance(toc_data[1]["children"], list)
 
-def test_print_toc_without_extraction(tmp_path):
+def test_print_toc_without_extraction(minimal_epub):
     """Test print_toc when TOC is not extracted."""
-    epub_path = tmp_path / "test.epub"
-    create_minimal_epub(epub_path)
-    parser = EPUBTOCParser(epub_path)
+    parser = EPUBTOCParser(minimal_epub)
     with pytest.raises(ValidationError, match="not extracted"):
-        parser.print_toc() 
\ No newline at end of file
+        parser.print_toc() 
+
+def test_print_toc_after_extraction(mock_epub_meta, minimal_epub, capsys):
+    """Test print_toc on the dictionaries stored by extract_toc."""
+    mock_epub_meta.return_value = {
+        "toc": [
+            {"title": "Chapter 1", "src": "ch1.html", "level": 0},
+            {"title": "Section 1.1", "src": "ch1.html#1", "level": 1}
+        ]
+    }
+    
+    parser = EPUBTOCParser(minimal_epub)
+    parser.extract_toc()
+    parser.print_toc()
+    assert capsys.readouterr().out == "\nTable of Contents:\n- Chapter 1\n  - Section 1.1\n"
+
+def test_parser_context_manager_closes_archive(minimal_epub):
+    """Test that the parser reuses one archive handle and closes it on exit."""
+    
+    with EPUBTOCParser(minimal_epub) as parser:
+        archive = parser._get_zip()
+        assert parser._get_zip() is archive
+    
+    assert parser._zip is None
+    assert archive.fp is None
+
+def test_package_paths_follow_container_and_manifest(tmp_path):
+    """Test that OPF/NCX are located via container.xml and the OPF manifest."""
+    epub_path = tmp_path / "test.epub"
+    with zipfile.ZipFile(epub_path, 'w') as epub:
+        epub.writestr('mimetype', 'application/epub+zip')
+        epub.writestr('META-INF/container.xml', '''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+    <rootfiles>
+        <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+    </rootfiles>
+</container>''')
+        # Decoys that a plain archive scan would pick first
+        epub.writestr('aaa/old.opf', '<package xmlns="http://www.idpf.org/2007/opf"/>')
+        epub.writestr('aaa/old.ncx', '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/"/>')
+        epub.writestr('OEBPS/content.opf', '''<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="2.0">
+    <manifest>
+        <item id="toc" href="nav/toc%20file.ncx" media-type="application/x-dtbncx+xml"/>
+        <item id="ch1" href="ch1.html" media-type="application/xhtml+xml"/>
+    </manifest>
+    <spine toc="toc">
+        <itemref idref="ch1"/>
+    </spine>
+</package>''')
+        epub.writestr('OEBPS/nav/toc file.ncx', '''<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+    <navMap>
+        <navPoint id="p1"><navLabel><text>Chapter 1</text></navLabel><content src="ch1.html"/></navPoint>
+    </navMap>
+</ncx>''')
+    
+    with EPUBTOCParser(epub_path) as parser:
+        assert parser._find_opf_path() == 'OEBPS/content.opf'
+        assert parser._find_ncx_path() == 'OEBPS/nav/toc file.ncx'
+        
+        ncx_toc = parser._extract_from_ncx()
+        assert [item.title for item in ncx_toc] == ["Chapter 1"]
+        
+        opf_toc = parser._extract_from_opf()
+        assert [item.href for item in opf_toc] == ["ch1.html"]
+
+def test_available_methods_skip_missing_sources(minimal_epub):
+    """Test that methods without a TOC source in the package are not offered."""
+    
+    with EPUBTOCParser(minimal_epub, extraction_methods=['epub_meta', 'ncx', 'opf']) as parser:
+        assert parser.available_methods() == ['epub_meta', 'opf']
+
+def test_extract_toc_is_memoized_until_file_changes(mock_epub_meta, minimal_epub):
+    """Test that repeated extract_toc calls reuse the result for an unchanged file."""
+    mock_epub_meta.return_value = {
+        "toc": [{"title": "Chapter 1", "src": "ch1.html", "level": 0}]
+    }
+    
+    parser = EPUBTOCParser(minimal_epub)
+    first = parser.extract_toc()
+    assert parser.extract_toc() is first
+    assert mock_epub_meta.call_count == 1
+    
+    # A newer modification time invalidates the cached result
+    stat = minimal_epub.stat()
+    os.utime(minimal_epub, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert parser.extract_toc() == first
+    assert mock_epub_meta.call_count == 2
+
+def test_extract_toc_reuses_probed_method_result(mock_epub_meta, minimal_epub):
+    """Test that extract_toc does not rerun a method that was already called."""
+    mock_epub_meta.return_value = {
+        "toc": [{"title": "Chapter 1", "src": "ch1.html", "level": 0}]
+    }
+    
+    parser = EPUBTOCParser(minimal_epub)
+    probed = parser._extract_from_epub_meta()
+    toc = parser.extract_toc()
+    assert toc == [item.to_dict() for item in probed]
+    assert mock_epub_meta.call_count == 1
+    assert parser.extraction_method == "epub_meta"
+
+def test_save_toc_to_json_reuses_epub_meta_result(mock_epub_meta, tmp_path, minimal_epub):
+    """Test that saving after extraction does not parse the metadata again."""
+    mock_epub_meta.return_value = {
+        "title": "Test Book",
+        "toc": [{"title": "Chapter 1", "src": "ch1.html", "level": 0}]
+    }
+    
+    parser = EPUBTOCParser(minimal_epub)
+    parser.extract_toc()
+    parser.save_toc_to_json(tmp_path / "toc.json")
+    assert mock_epub_meta.call_count == 1
+    
+    with open(tmp_path / "toc.json") as f:
+        data = json.load(f)
+    assert data["metadata"]["title"] == "Test Book"
+    assert data["toc"] == parser.toc
+
+def test_slow_methods_are_raced_under_timeout(mocker, minimal_epub):
+    """Test that external-tool methods run concurrently after the others fail."""
+    for name in ['epub_meta', 'ncx', 'opf', 'ebooklib']:
+        mocker.patch.object(EPUBTOCParser, f'_extract_from_{name}', return_value=None)
+    
+    def hang(self):
+        time.sleep(0.5)
+    mocker.patch.object(EPUBTOCParser, '_extract_from_tika', hang)
+    mocker.patch.object(
+        EPUBTOCParser, '_extract_from_calibre',
+        return_value=[TOCItem("Chapter 1", "ch1.html")]
+    )
+    
+    parser = EPUBTOCParser(minimal_epub)
+    parser.SLOW_METHOD_TIMEOUT = 0.1
+    assert [item['title'] for item in parser.extract_toc()] == ["Chapter 1"]
+    
+    mocker.patch.object(EPUBTOCParser, '_extract_from_calibre', hang)
+    parser = EPUBTOCParser(minimal_epub)
+    parser.SLOW_METHOD_TIMEOUT = 0.1
+    with pytest.raises(ExtractionError, match="Timed out"):
+        parser.extract_toc()
+
+def test_slow_method_result_follows_priority(mocker, minimal_epub):
+    """Test that a faster slow method does not outrank a higher-priority one."""
+    for name in ['epub_meta', 'ncx', 'opf', 'ebooklib']:
+        mocker.patch.object(EPUBTOCParser, f'_extract_from_{name}', return_value=None)
+    
+    def slow_tika(self):
+        time.sleep(0.1)
+        return [TOCItem("From Tika", "ch1.html")]
+    mocker.patch.object(EPUBTOCParser, '_extract_from_tika', slow_tika)
+    mocker.patch.object(
+        EPUBTOCParser, '_extract_from_calibre',
+        return_value=[TOCItem("From Calibre", "ch1.html")]
+    )
+    
+    parser = EPUBTOCParser(minimal_epub)
+    assert [item['title'] for item in parser.extract_toc()] == ["From Tika"]
+    assert parser.extraction_method == "tika"
+
+def test_extract_toc_uses_cache_dir(mock_epub_meta, tmp_path, minimal_epub):
+    """Test that a TOC saved in cache_dir is reused by a new parser."""
+    cache_dir = tmp_path / "cache"
+    mock_epub_meta.return_value = {
+        "toc": [{"title": "Chapter 1", "src": "ch1.html", "level": 0}]
+    }
+    
+    first = EPUBTOCParser(minimal_epub, cache_dir=cache_dir).extract_toc()
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    
+    cached = EPUBTOCParser(minimal_epub, cache_dir=cache_dir)
+    assert cached.extract_toc() == first
+    assert cached.extraction_method == "epub_meta"
+    assert mock_epub_meta.call_count == 1
+    
+    # A changed file gets a new cache entry
+    stat = minimal_epub.stat()
+    os.utime(minimal_epub, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    EPUBTOCParser(minimal_epub, cache_dir=cache_dir).extract_toc()
+    assert mock_epub_meta.call_count == 2
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+def test_extract_toc_reads_ncx_before_epub_meta(mock_epub_meta, minimal_epub):
+    """Test that the default order reads an existing NCX without epub_meta."""
+    with zipfile.ZipFile(minimal_epub, 'a') as epub:
+        epub.writestr('toc.ncx', '''<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+    <navMap>
+        <navPoint id="p1"><navLabel><text>Chapter 1</text></navLabel><content src="ch1.html"/></navPoint>
+    </navMap>
+</ncx>''')
+    
+    toc = EPUBTOCParser(minimal_epub).extract_toc()
+    assert [item['title'] for item in toc] == ["Chapter 1"]
+    assert mock_epub_meta.call_count == 0
+
+def test_requested_method_order_is_followed(mock_epub_meta, mocker, minimal_epub):
+    """Test that extract_toc runs only the requested methods, in that order."""
+    mock_epub_meta.return_value = {
+        "toc": [{"title": "From epub_meta", "src": "ch1.html", "level": 0}]
+    }
+    mocker.patch.object(
+        EPUBTOCParser, '_extract_from_opf',
+        return_value=[TOCItem("From OPF", "ch1.html")]
+    )
+    
+    parser = EPUBTOCParser(minimal_epub, extraction_methods=['opf', 'epub_meta'])
+    assert [item['title'] for item in parser.extract_toc()] == ["From OPF"]
+    assert parser.extraction_method == "opf"
+    
+    parser = EPUBTOCParser(minimal_epub, extraction_methods=['epub_meta', 'opf'])
+    assert [item['title'] for item in parser.extract_toc()] == ["From epub_meta"]
+    assert parser.extraction_method == "epub_meta"
+
+def test_validate_toc_structure_handles_deep_nesting(minimal_epub):
+    """Test that validation of very deep TOCs does not recurse."""
+    parser = EPUBTOCParser(minimal_epub)
+    
+    root = item = TOCItem("Level 0", "ch.html", level=0)
+    for level in range(1, 5000):
+        child = TOCItem(f"Level {level}", "ch.html", level=level)
+        item.add_child(child)
+        item = child
+    parser._validate_toc_structure([root])
+    assert root.to_dict()['children'][0]['title'] == "Level 1"
+    
+    item.level = -1
+    with pytest.raises(ValidationError, match="Invalid level"):
+        parser._validate_toc_structure([root])
+
+def test_extract_from_calibre_parses_indentation(mocker, minimal_epub):
+    """Test that ebook-meta output indentation becomes TOC nesting."""
+    run = mocker.patch("epub_toc.parser.subprocess.run")
+    run.return_value.stdout = (
+        "Chapter 1 -> ch1.html\n"
+        "  Section 1.1 -> ch1.html#s1\n"
+        "\n"
+        "Chapter 2 -> ch2.html\n"
+    )
+    
+    parser = EPUBTOCParser(minimal_epub)
+    result = parser._extract_from_calibre()
+    assert [item.title for item in result] == ["Chapter 1", "Chapter 2"]
+    assert result[0].children[0].href == "ch1.html#s1"
+    assert result[0].children[0].level == 2
+    assert run.call_args[1]['timeout'] == parser.SLOW_METHOD_TIMEOUT
+
+def test_module_helpers_return_private_copies(mock_epub_meta, minimal_epub):
+    """Test that the cached TOC behind get_toc cannot be changed by a caller."""
+    from epub_toc import _extract, get_toc
+    mock_epub_meta.return_value = {
+        "toc": [{"title": "Chapter 1", "src": "ch1.html", "level": 0}]
+    }
+    
+    toc = _extract(minimal_epub)
+    toc[0]['title'] = "Changed"
+    toc.clear()
+    assert [item['title'] for item in json.loads(get_toc(minimal_epub))] == ["Chapter 1"]
+    assert mock_epub_meta.call_count == 1
+
+@pytest.mark.parametrize("indent", [None, 2, 4])
+def test_save_toc_to_json_output_does_not_depend_on_orjson(mock_epub_meta, mocker, tmp_path, minimal_epub, indent):
+    """Test that the JSON file is the same with and without orjson."""
+    pytest.importorskip("orjson")
+    mock_epub_meta.return_value = {
+        "title": "Книга",
+        "toc": [
+            {"title": "Глава 1", "src": "ch1.html", "level": 0},
+            {"title": "Section 1.1", "src": "ch1.html#1", "level": 1}
+        ]
+    }
+    
+    parser = EPUBTOCParser(minimal_epub)
+    parser.extract_toc()
+    parser.save_toc_to_json(tmp_path / "with_orjson.json", indent=indent)
+    mocker.patch("epub_toc.parser.orjson", None)
+    parser.save_toc_to_json(tmp_path / "stdlib.json", indent=indent)
+    assert (tmp_path / "with_orjson.json").read_bytes() == (tmp_path / "stdlib.json").read_bytes()